@@ -0,0 +1,5 @@
+"""Kronologic game engine, shared server state and headless tooling.
+
+The Streamlit page (``app.py``) imports from here; everything in this package
+can also be used without a running Streamlit server.
+"""
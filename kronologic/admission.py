@@ -0,0 +1,180 @@
+"""Admission control for GlobalGameState: token buckets and a generation gate.
+
+Every state-changing action is charged against two buckets, one for the
+calling session and one for the room.  The API also charges each request to
+its network address (``check_client``), with limits high enough for a club
+behind one NAT or a bot host; that cap only stops a single machine from
+rotating session ids.  Board generation (join of a new room,
+"🆕 开启新局") additionally needs a slot in a small bounded gate, so a burst
+of new games queues briefly and is then turned away instead of piling up
+behind the GIL.  Rejections raise ServerBusy and are counted per reason.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# action -> (tokens refilled per second, bucket size)
+SESSION_LIMITS = {
+    "investigate": (1.0, 5),                   # the page already sleeps 1s after each query
+    "new_game":    (0.2, 2),
+    "reset":       (0.2, 2),
+    "join":        (1.0, 10),                  # each page load joins once
+    "reveal":      (0.5, 3),
+}
+ROOM_LIMITS = {
+    "investigate": (10.0, 20),
+    "new_game":    (0.5, 3),
+    "reset":       (0.5, 3),
+    "join":        (5.0, 30),
+    "reveal":      (2.0, 10),
+}
+
+CLIENT_LIMITS = {                              # per network address, API only
+    "investigate": (20.0, 100),
+    "new_game":    (2.0, 20),
+    "reset":       (2.0, 20),
+    "join":        (10.0, 100),
+    "reveal":      (5.0, 50),
+}
+
+GENERATION_SLOTS = 4                           # synchronous generations running or waiting
+GENERATION_WAIT  = 2.0                         # seconds a generation may wait for a slot
+
+
+class ServerBusy(RuntimeError):
+    """The request was refused to protect the server; retry after `retry_after` seconds."""
+
+    def __init__(self, reason, retry_after=1.0):
+        super().__init__(f"server busy ({reason}), retry in {retry_after:.1f}s")
+        self.reason      = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate, burst):
+        self.rate   = rate
+        self.burst  = burst
+        self.tokens = float(burst)
+        self.stamp  = time.monotonic()
+
+    def take(self, now, cost=1.0):
+        """Spend cost tokens.  Returns 0.0 on success, else seconds until it would succeed."""
+        wait = self.wait(now, cost)
+        if not wait:
+            self.tokens -= cost
+        return wait
+
+    def wait(self, now, cost=1.0):
+        """Seconds until cost tokens are available (0.0 if they are now); spends nothing."""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp  = now
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """One token bucket per (key, action), bounded to the max_keys most recent keys."""
+
+    def __init__(self, limits, max_keys=4096):
+        self.limits   = limits
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock    = threading.Lock()
+
+    def check(self, key, action):
+        """0.0 if allowed (a token is spent), else the suggested retry delay."""
+        bucket = self.bucket(key, action)
+        if bucket is None:
+            return 0.0
+        with self._lock:
+            return bucket.take(time.monotonic())
+
+    def bucket(self, key, action):
+        """The (key, action) bucket, created on first use; None if the action is unlimited."""
+        limit = self.limits.get(action)
+        if limit is None:
+            return None
+        with self._lock:
+            bucket = self._buckets.get((key, action))
+            if bucket is None:
+                bucket = self._buckets[(key, action)] = TokenBucket(*limit)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end((key, action))
+            return bucket
+
+
+class Admission:
+    def __init__(self, session_limits=SESSION_LIMITS, room_limits=ROOM_LIMITS, client_limits=CLIENT_LIMITS,
+                 generation_slots=GENERATION_SLOTS, generation_wait=GENERATION_WAIT):
+        self.sessions        = RateLimiter(session_limits)
+        self.rooms           = RateLimiter(room_limits)
+        self.clients         = RateLimiter(client_limits)
+        self.generation_wait = generation_wait
+        self._slots          = threading.BoundedSemaphore(generation_slots)
+        self._lock           = threading.Lock()
+        self._charge         = threading.Lock()   # session + room buckets are tested, then spent, together
+        self.admitted        = 0
+        self.rejected        = {"session": 0, "room": 0, "client": 0, "generation": 0}
+
+    @classmethod
+    def unlimited(cls):
+        return cls(session_limits={}, room_limits={}, client_limits={}, generation_slots=1 << 16)
+
+    @classmethod
+    def scaled(cls, factor):
+        """Default limits with every rate and burst multiplied by factor; 0 turns them off."""
+        if factor <= 0:
+            return cls.unlimited()
+
+        def scale(limits):
+            return {action: (rate * factor, max(1, round(burst * factor))) for action, (rate, burst) in limits.items()}
+        return cls(scale(SESSION_LIMITS), scale(ROOM_LIMITS), scale(CLIENT_LIMITS))
+
+    def check(self, session, game_key, action):
+        """Charge one action to the session (if known) and the room; raise ServerBusy if either is empty.
+        Nothing is spent on a refusal, so a full room does not drain the caller's bucket."""
+        buckets = [("session", self.sessions.bucket(session, action) if session is not None else None),
+                   ("room",    self.rooms.bucket(game_key, action))]
+        with self._charge:
+            now = time.monotonic()
+            for reason, bucket in buckets:
+                wait = bucket.wait(now) if bucket is not None else 0.0
+                if wait:
+                    self._reject(reason)
+                    raise ServerBusy(reason, wait)
+            for _, bucket in buckets:
+                if bucket is not None:
+                    bucket.take(now)
+        with self._lock:
+            self.admitted += 1
+
+    def check_client(self, client, action):
+        """Charge one request to a network address (if known); raise ServerBusy when it is spent."""
+        wait = self.clients.check(client, action) if client is not None else 0.0
+        if wait:
+            self._reject("client")
+            raise ServerBusy("client", wait)
+
+    @contextmanager
+    def generation(self):
+        """Hold one generation slot for the duration of the block."""
+        if not self._slots.acquire(timeout=self.generation_wait):
+            self._reject("generation")
+            raise ServerBusy("generation", self.generation_wait)
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"admitted": self.admitted, "rejected": dict(self.rejected)}
+
+    def _reject(self, reason):
+        with self._lock:
+            self.rejected[reason] += 1
@@ -0,0 +1,227 @@
+"""Live gameplay analytics, updated incrementally from GlobalGameState events.
+
+The server calls ``Analytics.on_event`` for every new game, investigation,
+reveal and log reset (see ``GlobalGameState.subscribe``).  Each event does a
+constant amount of work: bump counters in the all-time tally and in the
+current slot of each time window.  ``snapshot()`` merges at most a window's
+worth of slots, so dashboards never walk the game store or the room logs.
+
+Per mode it tracks games, investigations (per game, as a histogram), reveals
+and time from game start to first reveal, the most queried (room, time) and
+(character, room) pairs, and how investigation answers break down
+("空无一人" / "从未去过" / "已知信息" / found someone).
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+
+# histogram bucket upper bounds (the last bucket is open-ended)
+REVEAL_SECONDS_BOUNDS = (30, 60, 120, 300, 600, 900, 1200, 1800, 2700, 3600, 7200)
+PER_GAME_BOUNDS       = (0, 2, 4, 6, 8, 10, 12, 15, 20, 25, 30, 40, 60)
+
+# window name -> (slot length in seconds, number of slots)
+WINDOWS = {
+    "hour": (60, 60),
+    "day":  (3600, 24),
+}
+
+
+def classify_answer(pri) -> str:
+    if "空无一人" in pri:
+        return "empty"
+    if "从未去过" in pri:
+        return "never"
+    if "已知信息" in pri:
+        return "known"
+    return "found"
+
+
+class Histogram:
+    """Fixed-bucket streaming histogram: O(log buckets) add, mergeable."""
+    __slots__ = ("bounds", "buckets", "count", "total", "max")
+
+    def __init__(self, bounds):
+        self.bounds  = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count   = 0
+        self.total   = 0.0
+        self.max     = None
+
+    def add(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max    = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+        self.count += other.count
+        self.total += other.total
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, capped at the largest value seen."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean":  self.total / self.count if self.count else None,
+            "p50":   self.quantile(0.5),
+            "p90":   self.quantile(0.9),
+            "max":   self.max,
+        }
+
+
+class Tally:
+    """Counters for one mode over one time span."""
+    __slots__ = ("counts", "location", "person", "reveal_s", "per_game")
+
+    def __init__(self):
+        self.counts   = Counter()              # games, investigations, reveals, resets, answer kinds
+        self.location = Counter()              # (room, time) -> queries
+        self.person   = Counter()              # (character, room) -> queries
+        self.reveal_s = Histogram(REVEAL_SECONDS_BOUNDS)
+        self.per_game = Histogram(PER_GAME_BOUNDS)
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.location.update(other.location)
+        self.person.update(other.person)
+        self.reveal_s.merge(other.reveal_s)
+        self.per_game.merge(other.per_game)
+
+    def snapshot(self, top) -> dict:
+        counts   = self.counts
+        answered = counts["investigations"]
+        return {
+            "games":          counts["games"],
+            "investigations": answered,
+            "reveals":        counts["reveals"],
+            "resets":         counts["resets"],
+            "answers":        {kind: counts[kind] for kind in ("empty", "never", "known", "found")},
+            "answer_share":   {kind: counts[kind] / answered if answered else 0.0
+                               for kind in ("empty", "never", "known", "found")},
+            "investigations_per_game": self.per_game.summary(),
+            "seconds_to_reveal":       self.reveal_s.summary(),
+            "top_locations":  [{"room": r, "time": t, "count": n} for (r, t), n in self.location.most_common(top)],
+            "top_persons":    [{"character": c, "room": r, "count": n} for (c, r), n in self.person.most_common(top)],
+        }
+
+
+class _Window:
+    """Ring of per-slot tallies; slots older than the window are dropped as time moves on."""
+
+    def __init__(self, slot_seconds, slots):
+        self.slot_seconds = slot_seconds
+        self.slots        = deque(maxlen=slots)    # (slot index, {mode: Tally})
+
+    def tally(self, now, mode) -> Tally:
+        slot = int(now // self.slot_seconds)
+        if not self.slots or self.slots[-1][0] != slot:
+            self.slots.append((slot, {}))
+        tallies = self.slots[-1][1]
+        if mode not in tallies:
+            tallies[mode] = Tally()
+        return tallies[mode]
+
+    def merged(self, now) -> dict:
+        oldest = int(now // self.slot_seconds) - self.slots.maxlen + 1
+        out    = {}
+        for slot, tallies in self.slots:
+            if slot < oldest:
+                continue
+            for mode, tally in tallies.items():
+                out.setdefault(mode, Tally()).merge(tally)
+        return out
+
+
+class Analytics:
+    def __init__(self, clock=time.time):
+        self.clock    = clock
+        self.totals   = {}                     # mode -> all-time Tally
+        self.windows  = {name: _Window(*spec) for name, spec in WINDOWS.items()}
+        self.games    = {}                     # game_key -> [mode, started, investigations, revealed]
+        self._lock    = threading.Lock()
+
+    # ---- feed (GlobalGameState listener) ----
+    def on_event(self, event, room_code, mode_choice, **data):
+        game_key = f"{room_code}_{mode_choice}"
+        now      = self.clock()
+        with self._lock:
+            if event == "game":
+                self._close_game(game_key, now)
+                self.games[game_key] = [mode_choice, now, 0, False]
+                self._bump(now, mode_choice, lambda t: t.counts.update(("games",)))
+            elif event == "investigate":
+                self._on_investigate(game_key, now, mode_choice, data)
+            elif event == "reveal":
+                self._on_reveal(game_key, now, mode_choice)
+            elif event == "reset":
+                self._bump(now, mode_choice, lambda t: t.counts.update(("resets",)))
+
+    def _on_investigate(self, game_key, now, mode_choice, data):
+        game = self.games.get(game_key)
+        if game is not None:
+            game[2] += 1
+        kind  = classify_answer(data["pri"])
+        pair  = (data["target"], data["arg"])
+        where = "location" if data["query_type"] == "location" else "person"
+
+        def apply(t):
+            t.counts.update(("investigations", kind))
+            getattr(t, where)[pair] += 1
+        self._bump(now, mode_choice, apply)
+
+    def _on_reveal(self, game_key, now, mode_choice):
+        game    = self.games.get(game_key)
+        elapsed = None
+        if game is not None and not game[3]:
+            game[3] = True
+            elapsed = now - game[1]
+
+        def apply(t):
+            t.counts.update(("reveals",))
+            if elapsed is not None:
+                t.reveal_s.add(elapsed)
+        self._bump(now, mode_choice, apply)
+
+    def _close_game(self, game_key, now):
+        # the room's previous game is over: record how many investigations it took
+        game = self.games.pop(game_key, None)
+        if game is not None:
+            mode, _, investigations, _ = game
+            self._bump(now, mode, lambda t: t.per_game.add(investigations))
+
+    def _bump(self, now, mode, apply):
+        if mode not in self.totals:
+            self.totals[mode] = Tally()
+        apply(self.totals[mode])
+        for window in self.windows.values():
+            apply(window.tally(now, mode))
+
+    # ---- read ----
+    def snapshot(self, window="all", top=5) -> dict:
+        """Per-mode statistics for "all" time or one of WINDOWS."""
+        if window != "all" and window not in self.windows:
+            raise ValueError(f"unknown window: {window}")
+        now = self.clock()
+        with self._lock:
+            tallies = self.totals if window == "all" else self.windows[window].merged(now)
+            modes   = {mode: tally.snapshot(top) for mode, tally in tallies.items()}
+            open_games = Counter(game[0] for game in self.games.values())
+        for mode, stats in modes.items():
+            stats["open_games"] = open_games[mode]
+        return {"window": window, "generated_at": now, "modes": modes}
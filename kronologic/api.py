@@ -0,0 +1,563 @@
+"""Lightweight asyncio JSON game API (HTTP + WebSocket) over GlobalGameState.
+
+Every operation is a small dict-in / dict-out function, reachable two ways:
+
+    HTTP       POST /<op>  with a JSON body   (GET /<op>?k=v also works)
+    WebSocket  GET /ws, then text frames {"op": "<op>", "id": 1, ...params}
+               answered with {"id": 1, "ok": true, "result": {...}}
+
+Ops: join, new_game, reset, investigate, logs, history, reveal, stats, analytics,
+tournament, round, leaderboard, end_tournament.  ``logs`` takes the ``cursor``
+returned by the previous call, so clients only fetch new entries; ``history``
+pages backwards through older ones.  ``tournament`` seats a batch of tables (kronologic.tournament),
+``round`` starts the next shared game on all of them, ``end_tournament`` lets
+the tables go.
+
+Rate limits follow the ``session`` field a client sends with every request
+(falling back to ``player``); a coarse per-address cap sits above it.
+
+Run standalone (own state)::
+
+    python -m kronologic.api --port 8765
+    python -m kronologic.api --port 8765 --limits 0       # no rate limits (load tests)
+
+or set ``KRONOLOGIC_API_PORT`` before ``streamlit run app.py`` and the page
+starts the service on a background thread sharing the page's GlobalGameState.
+Only the standard library is used.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import struct
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+from kronologic import codec
+from kronologic.admission import Admission, ServerBusy
+from kronologic.engine import MODE_HANDLERS, get_handler
+from kronologic.server import GlobalGameState
+from kronologic.tournament import Tournament
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES   = 64 * 1024
+LOG_PAGE_DEFAULT = 50                     # entries per logs/history reply unless the client asks
+LOG_PAGE_MAX     = 200
+WS_GUID          = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large", 429: "Too Many Requests",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status  = status
+        self.message = message
+
+
+def _json_default(obj):
+    # numpy scalars coming out of pandas
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+
+def _dumps(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+# ==============================================================================
+# Operations  —  plain functions of (server, params) -> dict
+# ==============================================================================
+
+def _require(params, name):
+    value = params.get(name)
+    if value is None or value == "":
+        raise ApiError(400, f"missing parameter: {name}")
+    return value
+
+
+def _room_and_mode(params):
+    room_code = str(_require(params, "room"))
+    mode_code = str(params.get("mode", "jewel"))
+    if mode_code not in MODE_HANDLERS:
+        raise ApiError(400, f"unknown mode: {mode_code}")
+    return room_code, mode_code
+
+
+def _existing_room(server, params):
+    room_code, mode_code = _room_and_mode(params)
+    if not server.has_game(room_code, mode_code):
+        raise ApiError(404, f"no game in room {room_code} ({mode_code}); join first")
+    return room_code, mode_code
+
+
+def _seed_param(params) -> str:
+    seed = params.get("seed")
+    if seed in (None, ""):
+        return ""
+    return str(_as_int(seed, "seed"))
+
+
+def _room_info(server, room_code, mode_code):
+    handler = get_handler(mode_code)
+    return {
+        "room":       room_code,
+        "mode":       mode_code,
+        "version":    server.get_version(room_code, mode_code),
+        "characters": handler.CHARACTERS,
+        "rooms":      handler.ROOMS,
+        "times":      handler.INVESTIG_TIME_OPTIONS,
+    }
+
+
+def op_join(server, params):
+    room_code, mode_code = _room_and_mode(params)
+    server.admission.check(params.get("session"), f"{room_code}_{mode_code}", "join")
+    server.get_game(room_code, mode_code, _seed_param(params))
+    return _room_info(server, room_code, mode_code)
+
+
+def op_new_game(server, params):
+    room_code, mode_code = _room_and_mode(params)
+    server.new_game(room_code, mode_code, _seed_param(params), session=params.get("session"))
+    return _room_info(server, room_code, mode_code)
+
+
+def op_reset(server, params):
+    room_code, mode_code = _existing_room(server, params)
+    server.reset_logs(room_code, mode_code, session=params.get("session"))
+    return {"room": room_code, "mode": mode_code}
+
+
+def op_investigate(server, params):
+    room_code, mode_code = _existing_room(server, params)
+    handler = get_handler(mode_code)
+    player  = str(_require(params, "player"))
+    kind    = params.get("kind", "location")
+
+    if kind == "location":
+        target = _require(params, "room_name")
+        arg    = _as_int(_require(params, "time"), "time")
+        if target not in handler.ROOMS or arg not in handler.INVESTIG_TIME_OPTIONS:
+            raise ApiError(400, "room_name/time not valid for this mode")
+    elif kind == "person":
+        target = _require(params, "character")
+        arg    = _require(params, "room_name")
+        if target not in handler.CHARACTERS or arg not in handler.ROOMS:
+            raise ApiError(400, "character/room_name not valid for this mode")
+    else:
+        raise ApiError(400, "kind must be 'location' or 'person'")
+
+    desc, pub, pri = server.investigate(room_code, mode_code, player, kind, target, arg,
+                                        session=params.get("session"))
+    return {"desc": desc, "public": pub, "private": pri}
+
+
+def _int_param(params, name, default):
+    return _as_int(params.get(name, default), name)
+
+
+def _as_int(value, name):
+    """value as an int.  Floats and strings like "2.9" are refused rather than
+    truncated (int(1.7) == 1 would silently pick another time slot)."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and re.fullmatch(r"[+-]?[0-9]+", value.strip()):
+        return int(value)
+    raise ApiError(400, f"{name} must be an integer")
+
+
+def _page_limit(params):
+    return max(1, min(LOG_PAGE_MAX, _int_param(params, "limit", LOG_PAGE_DEFAULT)))
+
+
+def _public_entries(entries, player):
+    out = []
+    for log in entries:
+        item = {k: log[k] for k in ("seq", "time", "player", "desc", "public", "type")}
+        # private lines are only ever shown to their owner (system lines are public)
+        if log["owner"] in ("SYSTEM", player):
+            item["private"] = log["private"]
+        out.append(item)
+    return out
+
+
+def op_logs(server, params):
+    """New entries since cursor.  At most `limit` player entries per reply;
+    when truncated, older ones are fetched with the history op."""
+    room_code, mode_code = _existing_room(server, params)
+    cursor = _int_param(params, "cursor", 0)
+
+    entries, cursor, reset, truncated = server.logs_since(room_code, mode_code, cursor, _page_limit(params))
+    return {
+        "version":   server.get_version(room_code, mode_code),
+        "cursor":    cursor,
+        "reset":     reset,
+        "truncated": truncated,
+        "entries":   _public_entries(entries, params.get("player")),
+    }
+
+
+def op_history(server, params):
+    """One page of player entries older than seq `before` (default: the newest page), oldest first."""
+    room_code, mode_code = _existing_room(server, params)
+    before = _int_param(params, "before", 0) if params.get("before") not in (None, "") else float("inf")
+
+    entries, more = server.room_log(room_code, mode_code).before(before, _page_limit(params))
+    return {
+        "more":    more,
+        "entries": _public_entries(entries, params.get("player")),
+    }
+
+
+def op_reveal(server, params):
+    room_code, mode_code = _existing_room(server, params)
+    player  = str(_require(params, "player"))
+    game    = server.reveal(room_code, mode_code, player, session=params.get("session"))
+    handler = get_handler(mode_code)
+    views   = handler.build_solution_views(game)
+    return {
+        "seed":     game.seed_val,
+        "code":     codec.encode(game).hex(),     # canonical board code (kronologic.codec)
+        "answer":   views["answer"],
+        "board":    {char: [game.board.loc[char, t] for t in handler.TIMES] for char in game.board.index},
+        "solution": game.solution_data.to_dict(orient="records"),
+    }
+
+
+def op_stats(server, params):
+    return server.stats()
+
+
+def op_analytics(server, params):
+    """Per-mode gameplay statistics; window = all | hour | day."""
+    try:
+        return server.analytics.snapshot(params.get("window", "all"), _int_param(params, "top", 5))
+    except ValueError as e:
+        raise ApiError(400, str(e))
+
+
+def _tournament(server, params):
+    name = str(_require(params, "name"))
+    if name not in server.tournaments:
+        raise ApiError(404, f"no tournament {name}")
+    return server.tournaments[name]
+
+
+def op_tournament(server, params):
+    """Create a tournament of `tables` rooms and start its first round."""
+    name   = str(_require(params, "name"))
+    mode   = str(params.get("mode", "jewel"))
+    tables = _int_param(params, "tables", 0)
+    if mode not in MODE_HANDLERS:
+        raise ApiError(400, f"unknown mode: {mode}")
+    if not 1 <= tables <= 1000:
+        raise ApiError(400, "tables must be between 1 and 1000")
+    cup = Tournament(server, name, mode, tables)
+    try:
+        cup.start(_seed_param(params) or None, session=params.get("session"))
+    except ValueError as e:                    # name taken, or too many tournaments running
+        raise ApiError(400, str(e))
+    return {"name": name, "mode": mode, "round": cup.round, "seed": cup.seed_val, "rooms": list(cup.tables)}
+
+
+def op_round(server, params):
+    cup = _tournament(server, params)
+    cup.start_round(_seed_param(params) or None, session=params.get("session"))
+    return {"name": cup.name, "round": cup.round, "seed": cup.seed_val}
+
+
+def op_leaderboard(server, params):
+    top = _int_param(params, "top", 0)
+    return _tournament(server, params).leaderboard(top or None)
+
+
+def op_end_tournament(server, params):
+    """Stop a tournament; its tables keep their games as ordinary rooms."""
+    cup = _tournament(server, params)
+    cup.close()
+    return {"name": cup.name, "rounds": cup.round, "leaderboard": cup.leaderboard()}
+
+
+OPERATIONS = {
+    "join":           op_join,
+    "new_game":       op_new_game,
+    "reset":          op_reset,
+    "investigate":    op_investigate,
+    "logs":           op_logs,
+    "history":        op_history,
+    "reveal":         op_reveal,
+    "stats":          op_stats,
+    "analytics":      op_analytics,
+    "tournament":     op_tournament,
+    "round":          op_round,
+    "leaderboard":    op_leaderboard,
+    "end_tournament": op_end_tournament,
+}
+
+# ops that may generate a board; run off the event loop so they don't stall it
+BLOCKING_OPS = {"join", "new_game", "tournament", "round"}
+
+
+# ==============================================================================
+# Transport  —  minimal HTTP/1.1 (keep-alive) and RFC 6455 text frames
+# ==============================================================================
+
+class GameAPI:
+    def __init__(self, server=None, token=None):
+        self.server = server if server is not None else GlobalGameState()
+        self.token  = token
+
+    async def call(self, op, params, client=None):
+        """Run one op.  client is the caller's network address, set by the transport.
+
+        Rate limits are per session: the request's "session" id (else its
+        "player"), scoped to the address so ids cannot collide across clients.
+        The address itself only has a coarse cap (admission.CLIENT_LIMITS)."""
+        fn = OPERATIONS.get(op)
+        if fn is None:
+            raise ApiError(404, f"unknown op: {op}")
+        own = params.get("session") or params.get("player")
+        if own in (None, ""):
+            session = client
+        else:
+            session = own if client is None else f"{client}/{own}"
+        params = dict(params, session=session)
+        try:
+            self.server.admission.check_client(client, op)
+            if op in BLOCKING_OPS:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, fn, self.server, params)
+            return fn(self.server, params)
+        except ServerBusy as e:
+            # 503 when the whole server is saturated, 429 when this client/room is
+            raise ApiError(503 if e.reason == "generation" else 429, str(e))
+
+    def _authorized(self, headers, query):
+        if not self.token:
+            return True
+        auth = headers.get("authorization", "")
+        return auth == f"Bearer {self.token}" or query.get("token") == self.token
+
+    async def handle_connection(self, reader, writer):
+        # the address, not the connection: reconnecting (or one connection per request)
+        # must not refill the buckets.  The API token is shared, so it is no identity.
+        peer   = writer.get_extra_info("peername")
+        client = f"ip:{peer[0]}" if peer else None
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._send_http(writer, 413, {"error": "headers too large"}, keep_alive=False)
+                    return
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._send_http(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                url   = urlsplit(target)
+                query = dict(parse_qsl(url.query))
+                path  = url.path.strip("/")
+
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._send_http(writer, 400, {"error": "bad Content-Length"}, keep_alive=False)
+                    return
+                if length > MAX_BODY_BYTES:
+                    await self._send_http(writer, 413, {"error": "body too large"}, keep_alive=False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+
+                if not self._authorized(headers, query):
+                    await self._send_http(writer, 401, {"error": "unauthorized"}, keep_alive)
+                elif path == "ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers, client)
+                    return
+                elif method not in ("GET", "POST"):
+                    await self._send_http(writer, 405, {"error": "use GET or POST"}, keep_alive)
+                else:
+                    await self._dispatch_http(writer, path, query, body, keep_alive, client)
+
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def _dispatch_http(self, writer, op, query, body, keep_alive, client):
+        params = dict(query)
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                await self._send_http(writer, 400, {"error": "body is not valid JSON"}, keep_alive)
+                return
+            if not isinstance(payload, dict):
+                await self._send_http(writer, 400, {"error": "body must be a JSON object"}, keep_alive)
+                return
+            params.update(payload)
+        try:
+            result = await self.call(op, params, client)
+            status = 200
+        except ApiError as e:
+            result, status = {"error": e.message}, e.status
+        except Exception as e:  # keep the connection and the server alive
+            result, status = {"error": f"{type(e).__name__}: {e}"}, 500
+        await self._send_http(writer, status, result, keep_alive)
+
+    async def _send_http(self, writer, status, payload, keep_alive):
+        body = _dumps(payload)
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    # ---- WebSocket ----
+    async def _websocket(self, reader, writer, headers, client):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            await self._send_http(writer, 400, {"error": "missing Sec-WebSocket-Key"}, keep_alive=False)
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        fragments, size = [], 0
+        while True:
+            try:
+                fin, opcode, payload = await self._read_frame(reader)
+            except (asyncio.IncompleteReadError, ConnectionError, ApiError):
+                return
+
+            if opcode == 0x8:                              # close
+                self._write_frame(writer, 0x8, payload[:2])
+                await writer.drain()
+                return
+            if opcode == 0x9:                              # ping
+                self._write_frame(writer, 0xA, payload)
+                await writer.drain()
+                continue
+            if opcode not in (0x0, 0x1):                   # pong / binary: ignore
+                continue
+
+            fragments.append(payload)
+            size += len(payload)
+            if size > MAX_BODY_BYTES:                      # assembled message too big
+                self._write_frame(writer, 0x8, struct.pack("!H", 1009))
+                await writer.drain()
+                return
+            if not fin:
+                continue
+            message, fragments, size = b"".join(fragments), [], 0
+
+            reply = await self._ws_message(message, client)
+            self._write_frame(writer, 0x1, _dumps(reply))
+            await writer.drain()
+
+    async def _ws_message(self, message, client):
+        try:
+            request = json.loads(message)
+        except ValueError:
+            return {"ok": False, "error": "message is not valid JSON"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "message must be a JSON object"}
+
+        req_id = request.pop("id", None)
+        op     = request.pop("op", None)
+        try:
+            result = await self.call(op, request, client)
+            return {"id": req_id, "ok": True, "result": result}
+        except ApiError as e:
+            return {"id": req_id, "ok": False, "status": e.status, "error": e.message}
+        except Exception as e:
+            return {"id": req_id, "ok": False, "status": 500, "error": f"{type(e).__name__}: {e}"}
+
+    async def _read_frame(self, reader):
+        b1, b2  = await reader.readexactly(2)
+        fin     = bool(b1 & 0x80)
+        opcode  = b1 & 0x0F
+        masked  = bool(b2 & 0x80)
+        length  = b2 & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await reader.readexactly(8))
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, "frame too large")
+        mask    = await reader.readexactly(4) if masked else b""
+        payload = await reader.readexactly(length)
+        if masked:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return fin, opcode, payload
+
+    @staticmethod
+    def _write_frame(writer, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            head = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 65536:
+            head = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            head = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        writer.write(head + payload)
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        srv = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        async with srv:
+            await srv.serve_forever()
+
+
+def start_background(server, host="127.0.0.1", port=8765, token=None) -> threading.Thread:
+    """Serve the API for an existing GlobalGameState on a daemon thread."""
+    api    = GameAPI(server, token)
+    thread = threading.Thread(target=lambda: asyncio.run(api.serve(host, port)),
+                              name="kronologic-api", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kronologic JSON game API")
+    parser.add_argument("--host",  default="127.0.0.1")
+    parser.add_argument("--port",  type=int, default=8765)
+    parser.add_argument("--token", default=None, help="require 'Authorization: Bearer <token>'")
+    parser.add_argument("--archive-dir", default=None, help="write finished games to this Parquet archive")
+    parser.add_argument("--limits", type=float, default=1.0, metavar="SCALE",
+                        help="multiply every rate limit and burst (0 = no limits, e.g. for load tests)")
+    args = parser.parse_args(argv)
+
+    server = GlobalGameState(archive_dir=args.archive_dir, admission=Admission.scaled(args.limits))
+    print(f"kronologic api listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(GameAPI(server, token=args.token).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
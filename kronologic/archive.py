@@ -0,0 +1,222 @@
+"""Append-only Parquet archive of finished games and their logs.
+
+When a room's log is dropped (``reset_logs``) or its game replaced
+(``new_game``), GlobalGameState emits a "finish" event carrying the game and
+its RoomLog.  GameArchiver only queues a reference on the request path; a
+background thread builds Arrow tables and writes them in batches, one new
+file per (mode, date) per flush, under hive-style partitions::
+
+    <root>/mode=jewel/date=2026-10-19/part-<ms>-<pid>-<n>.parquet
+
+Each row is one finished log: a game's log up to a reset, or up to the game
+being replaced (``reason``), with seed, canonical board code
+(kronologic.codec), initial clues, pace list, every log event and the query
+answers recorded since the game's previous row, so a game reset before it
+ends has several rows and no query twice.  Rows are validated one by one; a
+game that does not fit the schema (e.g. a seed beyond int64) is counted in
+``errors`` without holding back the rest of its batch.
+``scan`` / ``iter_games`` read the archive lazily, batch by batch, with
+partition pruning and column/row filters, so large archives never have to fit
+in memory.
+
+pyarrow is already a Streamlit dependency.
+"""
+
+import atexit
+import itertools
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from kronologic import codec
+
+FLUSH_ROWS     = 256                           # write as soon as this many games are queued
+FLUSH_INTERVAL = 30.0                          # ... or after this many seconds
+MAX_PENDING    = 10_000                        # queue bound; beyond it games are dropped and counted
+
+EVENT_TYPE = pa.struct([
+    ("seq",     pa.int64()),
+    ("time",    pa.string()),
+    ("player",  pa.string()),
+    ("owner",   pa.string()),
+    ("type",    pa.string()),
+    ("desc",    pa.string()),
+    ("public",  pa.string()),
+    ("private", pa.string()),
+])
+QUERY_TYPE = pa.struct([
+    ("target", pa.string()),                   # room (location query) or character (person query)
+    ("arg",    pa.string()),                   # time or room
+    ("answer", pa.string()),
+])
+CLUE_TYPE = pa.struct([("char", pa.string()), ("room", pa.string())])
+
+# partition columns (mode, date) live in the directory names, not in the files
+SCHEMA = pa.schema([
+    ("room",          pa.string()),
+    ("seed",          pa.int64()),
+    ("board",         pa.binary(codec.CODE_BYTES)),
+    ("started_at",    pa.timestamp("ms")),
+    ("finished_at",   pa.timestamp("ms")),
+    ("reason",        pa.string()),            # "new_game" | "reset"
+    ("initial_clues", pa.list_(CLUE_TYPE)),
+    ("pace_list",     pa.list_(pa.list_(pa.int8()))),
+    ("events",        pa.list_(EVENT_TYPE)),
+    ("queries",       pa.list_(QUERY_TYPE)),
+])
+PARTITIONING = ds.partitioning(pa.schema([("mode", pa.string()), ("date", pa.string())]), flavor="hive")
+
+
+class GameArchiver:
+    def __init__(self, root, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.root           = root
+        self.flush_rows     = flush_rows
+        self.flush_interval = flush_interval
+        self._queue         = queue.Queue(maxsize=max_pending)
+        self._files         = itertools.count()
+        self._lock          = threading.Lock()
+        self.archived       = 0
+        self.dropped        = 0
+        self.files          = 0
+        self.errors         = 0
+        self._thread        = threading.Thread(target=self._run, name="kronologic-archive", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---- GlobalGameState listener ----
+    def on_event(self, event, room_code, mode_choice, **data):
+        if event != "finish":
+            return
+        room_log = data["log"]
+        game     = data["game"]
+        # the query memo outlives a reset: only answers not in an earlier row of this game
+        done    = getattr(game, "archived_queries", 0)
+        queries = list(game.query.items())[done:]
+        game.archived_queries = done + len(queries)
+        # only references and shallow copies here; rows are built on the writer thread
+        item = (room_code, mode_choice, game, list(room_log.pinned) + list(room_log.entries),
+                queries, data.get("started_at"), time.time(), data["reason"])
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def close(self):
+        """Flush everything queued and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"archived": self.archived, "pending": self._queue.qsize(), "dropped": self.dropped,
+                    "files": self.files, "errors": self.errors}
+
+    # ---- writer thread ----
+    def _run(self):
+        pending  = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+            if item:
+                pending.append(item)
+            if item is None or len(pending) >= self.flush_rows or time.monotonic() >= deadline:
+                self._flush(pending)
+                pending  = []
+                deadline = time.monotonic() + self.flush_interval
+            if item is None:
+                return
+
+    def _flush(self, items):
+        if not items:
+            return
+        groups = {}
+        for item in items:
+            date = datetime.fromtimestamp(item[6]).strftime("%Y-%m-%d")
+            groups.setdefault((item[1], date), []).append(item)
+
+        for (mode, date), group in groups.items():
+            tables = []
+            for item in group:
+                try:
+                    tables.append(pa.Table.from_pylist([self._row(*item)], schema=SCHEMA))
+                except Exception:              # one bad game must not cost its batch
+                    with self._lock:
+                        self.errors += 1
+            if not tables:
+                continue
+            try:
+                self._write(mode, date, pa.concat_tables(tables))
+            except Exception:                  # never take the server down over the archive
+                with self._lock:
+                    self.errors += len(tables)
+                continue
+            with self._lock:
+                self.archived += len(tables)
+                self.files    += 1
+
+    def _write(self, mode, date, table):
+        folder = os.path.join(self.root, f"mode={mode}", f"date={date}")
+        os.makedirs(folder, exist_ok=True)
+        name   = f"part-{int(time.time() * 1000)}-{os.getpid()}-{next(self._files)}.parquet"
+        tmp    = os.path.join(folder, f".{name}.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, os.path.join(folder, name))        # readers never see a partial file
+
+    @staticmethod
+    def _row(room_code, mode, game, entries, queries, started_at, finished_at, reason) -> dict:
+        return {
+            "room":          room_code,
+            "seed":          game.seed_val,
+            "board":         codec.encode(game),
+            "started_at":    datetime.fromtimestamp(started_at) if started_at else None,
+            "finished_at":   datetime.fromtimestamp(finished_at),
+            "reason":        reason,
+            "initial_clues": [{"char": c["char"], "room": c["room"]} for c in game.initial_clues],
+            "pace_list":     getattr(game, "pace_list", None) or [],
+            "events":        [{k: e.get(k) for k in EVENT_TYPE.names} for e in entries],
+            "queries":       [{"target": str(key[0]), "arg": str(key[1]), "answer": answer}
+                              for key, answer in queries],
+        }
+
+
+# ==============================================================================
+# Reading
+# ==============================================================================
+
+def dataset(root) -> ds.Dataset:
+    return ds.dataset(root, format="parquet", partitioning=PARTITIONING, schema=SCHEMA.append(
+        pa.field("mode", pa.string())).append(pa.field("date", pa.string())))
+
+
+def scan(root, mode=None, date_from=None, date_to=None, columns=None, filter=None, batch_size=1024):
+    """Yield pyarrow RecordBatches of archived games.
+
+    mode / date_from / date_to ("YYYY-MM-DD", inclusive) prune whole partition
+    directories; filter is any extra pyarrow.dataset expression, e.g.
+    ``ds.field("seed") == 42``.  Only the requested columns are read."""
+    if not os.path.isdir(root):
+        return
+    expr = filter
+    for cond in (ds.field("mode") == mode if mode else None,
+                 ds.field("date") >= date_from if date_from else None,
+                 ds.field("date") <= date_to if date_to else None):
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    yield from dataset(root).to_batches(columns=columns, filter=expr, batch_size=batch_size)
+
+
+def iter_games(root, **kwargs):
+    """scan(), one dict per archived game."""
+    for batch in scan(root, **kwargs):
+        yield from batch.to_pylist()
@@ -0,0 +1,141 @@
+"""Canonical fixed-width encoding of a game board.
+
+Every registered board is 6 characters x 6 times over at most 6 rooms, so it
+fits in a short byte string instead of a DataFrame.  The layout is fixed for
+all modes (resized ``engine.make_variant`` boards are not encodable):
+
+    byte  0       mode index (MODE_CODES)
+    bytes 1..12   board, one base-len(ROOMS) digit per (character, time), in
+                  handler.CHARACTERS x TIMES order
+    bytes 13..20  Ritual pace metadata (pattern + offset per character), 0 for
+                  the other modes
+
+The same board always gives the same code, so codes can be compared, hashed,
+used as cache/dict keys and shipped between processes without pickling.
+``int.from_bytes(code, "big")`` gives the equivalent fixed-width integer.
+"""
+
+import hashlib
+from collections import namedtuple
+
+import pandas as pd
+
+from kronologic.engine import get_handler
+
+# index = byte 0 of a code; append only, never reorder
+MODE_CODES = ("jewel", "ritual_easy", "ritual_hard", "sd_engineer")
+PACE_MODES = ("ritual_easy", "ritual_hard")    # modes whose games carry ritual_patterns
+
+BOARD_BYTES = 12                               # 6 ** 36 < 2 ** 96
+META_BYTES  = 8                                # 648 ** 6 < 2 ** 64
+CODE_BYTES  = 1 + BOARD_BYTES + META_BYTES
+
+# per-character pace metadata: 1 length bit (3/4 steps) x 4 base-3 step digits x 2 offset bits
+_META_RADIX = 2 * 81 * 4
+
+_MODE_INDEX = {mode: i for i, mode in enumerate(MODE_CODES)}
+_ROOM_INDEX = {mode: {room: i for i, room in enumerate(get_handler(mode).ROOMS)} for mode in MODE_CODES}
+
+Decoded = namedtuple("Decoded", "mode board ritual_patterns")
+
+
+def encode(game) -> bytes:
+    """Code of a ScenarioGenerator's board (and pace metadata, if the mode has it)."""
+    return encode_board(game.mode, game.board, getattr(game, "ritual_patterns", None))
+
+
+def encode_board(mode, board: pd.DataFrame, ritual_patterns=None) -> bytes:
+    handler = get_handler(mode)
+    if board.index.tolist() != handler.CHARACTERS or board.columns.tolist() != handler.TIMES:
+        board = board.loc[handler.CHARACTERS, handler.TIMES]  # canonical order (generated boards already are)
+    return encode_rows(mode, board.to_numpy().tolist(), ritual_patterns)
+
+
+def encode_rows(mode, rows, ritual_patterns=None) -> bytes:
+    """rows: one list of room names per character, in handler.CHARACTERS order."""
+    handler = get_handler(mode)
+    index   = _ROOM_INDEX[mode]
+    radix   = len(handler.ROOMS)
+
+    value = 0
+    for row in rows:
+        for room in row:
+            value = value * radix + index[room]
+
+    meta = 0
+    if ritual_patterns:
+        for char in handler.CHARACTERS:
+            info = ritual_patterns[char]
+            meta = meta * _META_RADIX + _pack_pace(info["pattern"], info["start_offset"])
+
+    return bytes((_MODE_INDEX[mode],)) + value.to_bytes(BOARD_BYTES, "big") + meta.to_bytes(META_BYTES, "big")
+
+
+def decode_rows(code: bytes):
+    """Fast path without pandas: (mode, rows of room indices, [(pattern, offset)] or None)."""
+    if len(code) != CODE_BYTES:
+        raise ValueError(f"board code must be {CODE_BYTES} bytes, got {len(code)}")
+    mode    = MODE_CODES[code[0]]
+    handler = get_handler(mode)
+    radix   = len(handler.ROOMS)
+    n_chars = len(handler.CHARACTERS)
+    n_times = len(handler.TIMES)
+
+    value = int.from_bytes(code[1:1 + BOARD_BYTES], "big")
+    cells = []
+    for _ in range(n_chars * n_times):
+        value, digit = divmod(value, radix)
+        cells.append(digit)
+    cells.reverse()
+    rows = [cells[i:i + n_times] for i in range(0, len(cells), n_times)]
+
+    meta  = int.from_bytes(code[1 + BOARD_BYTES:], "big")
+    paces = None
+    if mode in PACE_MODES:
+        paces = []
+        for _ in range(n_chars):
+            meta, packed = divmod(meta, _META_RADIX)
+            paces.append(_unpack_pace(packed))
+        paces.reverse()
+    return mode, rows, paces
+
+
+def decode(code: bytes) -> Decoded:
+    """Inverse of encode: the board DataFrame and, for Ritual, ritual_patterns."""
+    mode, rows, paces = decode_rows(code)
+    handler = get_handler(mode)
+    rooms   = handler.ROOMS
+
+    board = pd.DataFrame([[rooms[i] for i in row] for row in rows], index=handler.CHARACTERS, columns=handler.TIMES)
+
+    ritual_patterns = None
+    if paces is not None:
+        ritual_patterns = {
+            char: {"pattern": pattern, "start_offset": offset, "start_room": board.loc[char, 1]}
+            for char, (pattern, offset) in zip(handler.CHARACTERS, paces)
+        }
+    return Decoded(mode, board, ritual_patterns)
+
+
+def board_hash(code: bytes) -> int:
+    """Stable 64-bit hash of a code (same value in every process, unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(code, digest_size=8).digest(), "big")
+
+
+# ---- pace packing: pattern of 3 or 4 steps in 1..3, offset < len(pattern) ----
+def _pack_pace(pattern, offset) -> int:
+    digits = 0
+    for step in list(pattern) + [1] * (4 - len(pattern)):
+        digits = digits * 3 + (step - 1)
+    return ((len(pattern) - 3) * 81 + digits) * 4 + offset
+
+
+def _unpack_pace(packed):
+    rest, offset   = divmod(packed, 4)
+    length, digits = divmod(rest, 81)
+    steps = []
+    for _ in range(4):
+        digits, d = divmod(digits, 3)
+        steps.append(d + 1)
+    steps.reverse()
+    return steps[:length + 3], offset
@@ -0,0 +1,243 @@
+"""Differential test harness: a candidate engine against the reference handlers.
+
+For every seed and mode it builds the game with both engines and compares
+the board, solution, initial clues, pace list and the answer to every
+possible investigation (all room x time and character x room tuples).  The
+reference oracle is ScenarioGenerator plus the mode handlers as they are.
+
+Investigation answers break ties with the global ``random`` module, so before
+each tuple both engines get the global generator reseeded with the same
+(seed, tuple) value; a candidate must draw from it the same way.
+
+Seeds are checked in chunks across a process pool.  Mismatches are reported
+per (mode, check) as the smallest failing seed, with a command that replays
+just that seed in detail.
+
+    python -m kronologic.difftest --candidate codec --count 100000
+    python -m kronologic.difftest --candidate mypkg.fastengine:Engine --count 2000000 --answers-every 50
+    python -m kronologic.difftest --candidate codec --modes jewel --seed 1234     # replay one seed
+
+A candidate is any object with ``generate(seed, mode) -> game`` and
+``investigate(game, mode, query_type, target, arg) -> (desc, pub, pri)``;
+the game needs ``board``, ``solution_data``, ``initial_clues`` and, for the
+Ritual modes, ``pace_list``.
+"""
+
+import argparse
+import importlib
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+
+from kronologic import codec
+from kronologic.engine import MODE_HANDLERS, ScenarioGenerator, get_handler
+
+CHUNK_SEEDS = 500
+
+
+class ReferenceEngine:
+    """The oracle: ScenarioGenerator and the handlers' own investigation code."""
+
+    def generate(self, seed, mode):
+        return ScenarioGenerator(seed_val=seed, mode=mode)
+
+    def investigate(self, game, mode, query_type, target, arg):
+        handler = get_handler(mode)
+        if query_type == "location":
+            return handler.investigate_location(game, target, arg)
+        return handler.investigate_person(game, target, arg)
+
+
+class CodecEngine(ReferenceEngine):
+    """Games rebuilt from their kronologic.codec board code (checks the codec round trip)."""
+
+    def generate(self, seed, mode):
+        ref     = ScenarioGenerator(seed_val=seed, mode=mode)
+        decoded = codec.decode(codec.encode(ref))
+        game    = SimpleNamespace(seed_val=seed, mode=mode, board=decoded.board, query={},
+                                  solution_data=ref.solution_data, initial_clues=ref.initial_clues)
+        if decoded.ritual_patterns is not None:
+            game.ritual_patterns = decoded.ritual_patterns
+            game.pace_list       = [info["pattern"] for info in decoded.ritual_patterns.values()]
+        return game
+
+
+ENGINES = {
+    "reference": ReferenceEngine,
+    "codec":     CodecEngine,
+}
+
+
+def load_engine(spec):
+    """"reference" / "codec", or "package.module:attr" naming a class or factory."""
+    if spec in ENGINES:
+        return ENGINES[spec]()
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr or "Engine")
+    return factory()
+
+
+def investigation_tuples(mode) -> list:
+    handler = get_handler(mode)
+    return ([("location", room, t) for room in handler.ROOMS for t in handler.INVESTIG_TIME_OPTIONS] +
+            [("person", char, room) for char in handler.CHARACTERS for room in handler.ROOMS])
+
+
+# ==============================================================================
+# Comparison (runs inside the worker processes)
+# ==============================================================================
+
+def compare_seed(reference, candidate, mode, seed, answers=True) -> list:
+    """[(check, detail)] for every difference between the two engines on one seed."""
+    diffs = []
+    try:
+        ref  = reference.generate(seed, mode)
+        cand = candidate.generate(seed, mode)
+    except Exception as e:
+        return [("generate", f"{type(e).__name__}: {e}")]
+
+    if not ref.board.equals(cand.board):
+        diffs.append(("board", f"reference:\n{ref.board}\ncandidate:\n{cand.board}"))
+    if not ref.solution_data.equals(cand.solution_data):
+        diffs.append(("solution", f"reference:\n{ref.solution_data}\ncandidate:\n{cand.solution_data}"))
+    if ref.initial_clues != cand.initial_clues:
+        diffs.append(("initial_clues", f"reference: {ref.initial_clues}\ncandidate: {cand.initial_clues}"))
+    if getattr(ref, "pace_list", None) != getattr(cand, "pace_list", None):
+        diffs.append(("pace_list", f"reference: {getattr(ref, 'pace_list', None)}\n"
+                                   f"candidate: {getattr(cand, 'pace_list', None)}"))
+
+    if answers:
+        for i, (query_type, target, arg) in enumerate(investigation_tuples(mode)):
+            random.seed(seed * 1000 + i)
+            expected = reference.investigate(ref, mode, query_type, target, arg)
+            random.seed(seed * 1000 + i)
+            try:
+                got = candidate.investigate(cand, mode, query_type, target, arg)
+            except Exception as e:
+                got = f"{type(e).__name__}: {e}"
+            if expected != got:
+                diffs.append((f"answer:{query_type}", f"{target} / {arg}\nreference: {expected}\ncandidate: {got}"))
+    return diffs
+
+
+def check_chunk(candidate_spec, mode, start, stop, answers_every=1) -> dict:
+    """Worker entry point: {"seeds": n, "first": {check: (seed, detail)}}."""
+    reference = ReferenceEngine()
+    candidate = load_engine(candidate_spec)
+    first     = {}
+    for seed in range(start, stop):
+        answers = bool(answers_every) and seed % answers_every == 0
+        for check, detail in compare_seed(reference, candidate, mode, seed, answers):
+            if check not in first:
+                first[check] = (seed, detail)
+    return {"mode": mode, "seeds": stop - start, "first": first}
+
+
+# ==============================================================================
+# Driver
+# ==============================================================================
+
+def run(candidate_spec, modes, start, count, workers=None, answers_every=1, max_failing_chunks=None,
+        progress=None) -> dict:
+    """Check seeds [start, start + count) for each mode.  Returns per-mode minimal failing seeds.
+
+    answers_every: compare investigation answers on every Nth seed (0 = never);
+    they dominate the cost, about 66 investigations per engine per seed."""
+    report = {mode: {"seeds": 0, "failures": {}} for mode in modes}
+    failing_chunks = 0
+    t0 = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(check_chunk, candidate_spec, mode, lo, min(lo + CHUNK_SEEDS, start + count),
+                               answers_every)
+                   for lo in range(start, start + count, CHUNK_SEEDS) for mode in modes]
+        for future in as_completed(futures):
+            result = future.result()
+            entry  = report[result["mode"]]
+            entry["seeds"] += result["seeds"]
+            for check, (seed, detail) in result["first"].items():
+                known = entry["failures"].get(check)
+                if known is None or seed < known["seed"]:
+                    entry["failures"][check] = {"seed": seed, "detail": detail}
+            if result["first"]:
+                failing_chunks += 1
+            if progress:
+                progress(sum(e["seeds"] for e in report.values()), count * len(modes))
+            if max_failing_chunks is not None and failing_chunks >= max_failing_chunks:
+                for f in futures:
+                    f.cancel()
+                break
+
+    report["_wall_s"] = time.perf_counter() - t0
+    return report
+
+
+def format_report(report, candidate_spec) -> str:
+    lines  = []
+    failed = False
+    for mode, entry in report.items():
+        if mode.startswith("_"):
+            continue
+        if not entry["failures"]:
+            lines.append(f"{mode:<12} OK        {entry['seeds']} seeds")
+            continue
+        failed = True
+        lines.append(f"{mode:<12} MISMATCH  {entry['seeds']} seeds checked")
+        for check, info in sorted(entry["failures"].items(), key=lambda kv: kv[1]["seed"]):
+            lines.append(f"    {check:<18} minimal seed {info['seed']}")
+            lines.append(f"        replay: python -m kronologic.difftest --candidate {candidate_spec} "
+                         f"--modes {mode} --seed {info['seed']}")
+    lines.append(f"wall {report['_wall_s']:.1f}s" + ("" if failed else "  — no differences"))
+    return "\n".join(lines)
+
+
+def replay(candidate_spec, modes, seed, answers=True) -> int:
+    reference = ReferenceEngine()
+    candidate = load_engine(candidate_spec)
+    status    = 0
+    for mode in modes:
+        diffs = compare_seed(reference, candidate, mode, seed, answers)
+        print(f"== {mode} seed {seed}: {'OK' if not diffs else f'{len(diffs)} difference(s)'}")
+        for check, detail in diffs:
+            print(f"-- {check}\n{detail}\n")
+        status = status or (1 if diffs else 0)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidate",  default="codec",
+                        help="engine to check: " + " | ".join(ENGINES) + " | package.module:attr")
+    parser.add_argument("--modes",      default=",".join(MODE_HANDLERS), help="comma-separated mode codes")
+    parser.add_argument("--start",      type=int, default=0,     help="first seed")
+    parser.add_argument("--count",      type=int, default=10000, help="seeds per mode")
+    parser.add_argument("--workers",    type=int, default=None,  help="process pool size (default: CPUs)")
+    parser.add_argument("--answers-every", type=int, default=1,
+                        help="compare investigation answers on every Nth seed (0 = never)")
+    parser.add_argument("--stop-after", type=int, default=None,
+                        help="stop once this many chunks have failed")
+    parser.add_argument("--seed",       type=int, default=None,  help="replay one seed with full details")
+    args = parser.parse_args(argv)
+
+    modes   = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODE_HANDLERS]
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(unknown)}")
+
+    if args.seed is not None:
+        return replay(args.candidate, modes, args.seed, args.answers_every != 0)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} seeds", end="", file=sys.stderr, flush=True)
+
+    report = run(args.candidate, modes, args.start, args.count, args.workers,
+                 args.answers_every, args.stop_after, progress)
+    print(file=sys.stderr)
+    print(format_report(report, args.candidate))
+    return 1 if any(entry["failures"] for mode, entry in report.items() if not mode.startswith("_")) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,731 @@
+"""Game engine: mode constants, per-mode handlers, registry and ScenarioGenerator.
+
+Kept out of ``app.py`` so the engine can be imported by tools (load tests,
+services) without executing the Streamlit page.
+
+Board size (characters, rooms, times and, for the walk modes, the room graph)
+is a property of the handler instance, not of the module: the registered
+modes use the classic 6 x 6 x 6 tables below, and ``make_variant`` builds
+resized handlers for offline analysis and benchmarks.  Solving and investigating go through a
+BoardIndex built once per board, so their cost grows with the number of
+people actually involved rather than with the size of the board.
+"""
+
+import math
+import random
+
+import pandas as pd
+import streamlit as st
+
+from kronologic.graphwalk import WalkGraph, ring_graph
+
+# ==============================================================================
+# 1. Shared Constants
+# ==============================================================================
+
+TIMES = [1, 2, 3, 4, 5, 6]
+
+# ==============================================================================
+# 2. Mode Configurations
+#    Each mode's static data is declared once here, then referenced by its handler.
+# ==============================================================================
+
+# ---------- Jewel (Paris 1920) ----------
+JEWEL_ROOMS      = ["牌坊", "信号", "鱿鱼", "面具", "音乐", "舞蹈"]
+JEWEL_CHARACTERS = ["(A) Accessoiriste", "(B) Baroness", "(C) Chauffeur",
+                    "(D) Director", "(J) Journalist", "(S) Soprano"]
+JEWEL_GRAPH = {
+    "牌坊": ["信号", "鱿鱼"],
+    "信号": ["鱿鱼", "牌坊"],
+    "鱿鱼": ["面具", "信号", "牌坊"],
+    "面具": ["鱿鱼", "音乐", "舞蹈"],
+    "音乐": ["面具", "舞蹈"],
+    "舞蹈": ["面具", "音乐"]
+}
+
+# ---------- Ritual (Cuzco 1450) — shared by easy & hard ----------
+RITUAL_TERRAIN   = ["山", "太阳", "星星", "台阶", "圆盘", "田"]
+RITUAL_SHARMANS  = ["(A) Artisan", "(E) Educator", "(F) Farmer",
+                    "(M) Merchant", "(P) Priestess", "(S) Soldier"]
+
+# ---------- SD Engineer (San Diego) ----------
+SD_AREA        = ["La Jolla", "Mira Mesa", "Del Mar", "4S Ranch", "Convoy"]
+SD_CHARACTERS  = ["(E) Eric", "(G) Grace", "(R) Rachel",
+                  "(W) Wen", "(X) Xaiver", "(Z) Zero"]
+SD_GRAPH = {
+    "Del Mar":    ["4S Ranch", "Mira Mesa", "La Jolla"],
+    "La Jolla":   ["Del Mar", "Mira Mesa", "Convoy"],
+    "Mira Mesa":  ["Del Mar", "Convoy", "La Jolla", "4S Ranch"],
+    "Convoy":     ["Mira Mesa", "4S Ranch", "La Jolla"],
+    "4S Ranch":   ["Del Mar", "Convoy", "Mira Mesa"]
+}
+
+# ---------- compiled walk tables (built once at import) ----------
+JEWEL_WALKS = WalkGraph(JEWEL_GRAPH, JEWEL_ROOMS)
+SD_WALKS    = WalkGraph(SD_GRAPH, SD_AREA)
+
+# ---------- per-board lookups (replace pandas masks in solve / investigate) ----------
+class BoardIndex:
+    """Lookup tables over one board, built in one pass over its cells.
+
+    rows[char][t] -> room, at[(t, room)] -> characters in board row order,
+    visits[(char, room)] -> times in order; the same orders the pandas masks
+    they replace produced, so answers (and their tie-breaking) are unchanged."""
+    __slots__ = ("rows", "at", "visits")
+
+    def __init__(self, board: pd.DataFrame):
+        times       = board.columns.tolist()
+        self.rows   = {}
+        self.at     = {}
+        self.visits = {}
+        for char, row in zip(board.index.tolist(), board.to_numpy().tolist()):
+            self.rows[char] = dict(zip(times, row))
+            for t, room in zip(times, row):
+                self.at.setdefault((t, room), []).append(char)
+                self.visits.setdefault((char, room), []).append(t)
+
+
+def board_index(game) -> BoardIndex:
+    """The game's BoardIndex, built on first use (games rebuilt from a code get one too)."""
+    index = getattr(game, "board_index", None)
+    if index is None:
+        index = game.board_index = BoardIndex(game.board)
+    return index
+
+# ==============================================================================
+# 3. Per-Mode Handler Classes
+#    Each class owns: board generation, solving, initial-clue generation,
+#    investigation answers and the GUI helpers (header, scratchpad, solution panel).
+#    The base class documents the contract; concrete classes fill it in.
+# ==============================================================================
+
+class BaseModeHandler:
+    """Contract that every mode must fulfil.  Never instantiated directly."""
+
+    # --- static metadata (override in subclass) ---
+    MODE_CODE   = ""          # e.g. "jewel"
+    ICON        = ""          # e.g. "💎"
+    CHARACTERS  = []          # list shown in person-query dropdown
+    ROOMS       = []          # list shown in location-query dropdown
+    TIMES       = TIMES       # 1-based, consecutive
+    GRAPH       = None        # room -> neighbouring rooms (walk modes)
+    WALKS       = None        # compiled GRAPH
+    INVESTIG_LOCATION_LABEL = "选择房间"
+    INVESTIG_PERSON_LABEL   = "选择角色"
+    INVESTIG_ROOM_LABEL     = "去过这个房间吗？"
+
+    def __init__(self, mode_code=None, characters=None, rooms=None, times=None, graph=None):
+        """Defaults are the class tables; pass any of them to build a resized variant.
+        times is the number of time steps; graph must cover every room."""
+        if mode_code:
+            self.MODE_CODE  = mode_code
+        if characters:
+            self.CHARACTERS = list(characters)
+        if rooms:
+            self.ROOMS      = list(rooms)
+        if times:
+            self.TIMES      = list(range(1, times + 1))
+        if graph:
+            self.GRAPH      = graph
+            self.WALKS      = WalkGraph(graph, self.ROOMS)
+
+    @property
+    def INVESTIG_TIME_OPTIONS(self) -> list:
+        return self.TIMES                    # every time step by default
+
+    # --- board generation helpers (called by ScenarioGenerator) ---
+    # All randomness must come from rng_instance.rng / the rng argument (a
+    # random.Random seeded with the game seed), never the global random module,
+    # so a seed reproduces the same game even when games are built concurrently.
+    def generate_board(self, rng_instance) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def solve(self, board: pd.DataFrame, rng=random):
+        """Return (solution_data, is_valid).  Called once after board is built."""
+        raise NotImplementedError
+
+    def generate_initial_clues(self, board: pd.DataFrame, solution_data, rng=random) -> list:
+        raise NotImplementedError
+
+    # --- GUI helpers (called by the main GUI sections) ---
+    def render_header(self, game):
+        raise NotImplementedError
+
+    def render_solution_panel(self, game):
+        raise NotImplementedError
+
+    def build_solution_views(self, game) -> dict:
+        """Build the tables/strings the solution panel displays.  Pure; no st.* calls."""
+        raise NotImplementedError
+
+    def solution_views(self, game) -> dict:
+        """build_solution_views, computed once per (mode, seed) and shared by all viewers."""
+        return _cached_solution_views(self.MODE_CODE, game.seed_val, self, game)
+
+    def log_extra_system_clues(self, game) -> list:
+        """Return extra system-log entries beyond the initial-clue one.
+        Default: none.  Ritual modes add the pace log, SD Engineer the road map."""
+        return []
+
+    # --- investigation answers (shared by every mode) ---
+    def investigate_location(self, game, target_room, selected_time):
+        """Answer "who was in target_room at selected_time".  Returns (desc, pub, pri)."""
+        index  = board_index(game)
+        people = index.at.get((selected_time, target_room), [])
+        count  = len(people)
+        desc   = f"查看了 **{target_room}** @ **T{selected_time}**"
+        pub    = f"该房间共有 **{count} 人**。"
+
+        query_tuple = (target_room, selected_time)
+        if query_tuple in game.query.keys():
+            return desc, pub, game.query[query_tuple]
+
+        if count == 0:
+            pri = "你看到：**空无一人**，可再进行一次调查"
+        else:
+            candidates = []
+            for p in people:
+                is_init = (selected_time == 1) and any(
+                    c['char'] == p and c['room'] == target_room for c in game.initial_clues
+                )
+                visits       = len(index.visits[(p, target_room)])
+                is_unique_visit = (visits == 1)
+
+                if   is_init:          score = 0
+                elif is_unique_visit:  score = 1
+                else:                  score = 2
+
+                candidates.append({'p': p, 'score': score})
+
+            random.shuffle(candidates)
+            candidates.sort(key=lambda x: x['score'], reverse=True)
+            best = candidates[0]
+
+            if best['score'] == 0:
+                chars_str = "、".join([c['p'] for c in candidates])
+                pri = f"⚠️ **已知信息**：初始线索已告知 **{chars_str}** 在 **T1** 位于此处, 可再调查一次。"
+            else:
+                seen = best['p']
+                pri  = f"你看到了 **{seen}** 独处一室" if count == 1 else f"透过缝隙认出了其中的 **{seen}**"
+
+        game.query[query_tuple] = pri
+        return desc, pub, pri
+
+    def investigate_person(self, game, target_char, target_room):
+        """Answer "has target_char been to target_room".  Returns (desc, pub, pri)."""
+        index   = board_index(game)
+        matches = index.visits.get((target_char, target_room), [])
+        count   = len(matches)
+        desc    = f"查看了 **{target_char}** 是否去过 **{target_room}**"
+        pub     = f"去过此处 **{count} 次**。"
+
+        query_tuple = (target_char, target_room)
+        if query_tuple in game.query.keys():
+            return desc, pub, game.query[query_tuple]
+
+        if count == 0:
+            pri = "线索：**从未去过**，可再进行一次调查"
+        else:
+            candidates = []
+            for t in matches:
+                is_init = (t == 1) and any(
+                    c['char'] == target_char and c['room'] == target_room for c in game.initial_clues
+                )
+                occupancy        = len(index.at[(t, target_room)])
+                is_single_occupancy = (occupancy == 1)
+
+                if   is_init:              score = 0
+                elif is_single_occupancy:  score = 1
+                else:                      score = 2
+
+                candidates.append({'t': t, 'score': score})
+
+            random.shuffle(candidates)
+            candidates.sort(key=lambda x: x['score'], reverse=True)
+            best = candidates[0]
+
+            if best['score'] == 0:
+                pri = f"⚠️ **已知信息**：初始线索已告知 **{target_char}** 在 **T1** 位于 **{target_room}**, 可再调查一次。"
+            else:
+                reveal = best['t']
+                pri    = f"发现时间：**T{reveal}**" if count == 1 else f"发现其中一次是在 **T{reveal}**"
+
+        game.query[query_tuple] = pri
+        return desc, pub, pri
+
+    # --- visual layout hint for scratchpad map ---
+    def scratchpad_rooms_order(self) -> list:
+        return self.ROOMS
+
+    def scratchpad_columns(self) -> int:
+        return math.ceil(math.sqrt(len(self.ROOMS)))   # 3 for the 5-6 room maps
+
+
+# --------------------------------------------------------------------------
+# 3a.  Jewel — 名伶的珠宝 (Paris 1920)
+# --------------------------------------------------------------------------
+class JewelHandler(BaseModeHandler):
+    MODE_CODE   = "jewel"
+    ICON        = "💎"
+    CHARACTERS  = JEWEL_CHARACTERS
+    ROOMS       = JEWEL_ROOMS
+    GRAPH       = JEWEL_GRAPH
+    WALKS       = JEWEL_WALKS
+    SPAWN_ROOM  = "舞蹈"
+    SPAWN_BY    = 3                          # valid boards find the jewel by this time
+    INVESTIG_LOCATION_LABEL = "选择房间"
+    INVESTIG_PERSON_LABEL   = "选择角色"
+    INVESTIG_ROOM_LABEL     = "去过这个房间吗？"
+
+    def __init__(self, mode_code=None, characters=None, rooms=None, times=None, graph=None,
+                 spawn_room=None, spawn_by=None):
+        super().__init__(mode_code, characters, rooms, times, graph)
+        if spawn_by:
+            self.SPAWN_BY   = spawn_by
+        if spawn_room:
+            self.SPAWN_ROOM = spawn_room
+        elif self.SPAWN_ROOM not in self.ROOMS:
+            self.SPAWN_ROOM = self.ROOMS[-1]
+
+    # ---- board generation ----
+    def generate_board(self, rng_instance) -> pd.DataFrame:
+        paths = self.WALKS.walks(rng_instance.rng, len(self.CHARACTERS), len(self.TIMES))
+        data  = {char: self.WALKS.names(path) for char, path in zip(self.CHARACTERS, paths)}
+
+        board = pd.DataFrame(data).T
+        board.columns = self.TIMES
+        return board
+
+    # ---- solving ----
+    def solve(self, board: pd.DataFrame, rng=random):
+        SPAWN_ROOM     = self.SPAWN_ROOM
+        index          = BoardIndex(board)
+        current_holder = None
+        jewel_active   = False
+        log            = []
+
+        for t in self.TIMES:
+            if not jewel_active:
+                people_in_spawn = index.at.get((t, SPAWN_ROOM), [])
+
+                if len(people_in_spawn) == 1:
+                    finder       = people_in_spawn[0]
+                    jewel_active = True
+                    current_holder = finder
+                    log.append({"Time": t, "Holder": finder, "Room": SPAWN_ROOM, "Desc": "✨ 发现珠宝！"})
+                else:
+                    log.append({"Time": t, "Holder": "无", "Room": SPAWN_ROOM, "Desc": "无人独处，珠宝未现身"})
+            else:
+                loc          = index.rows[current_holder][t]
+                people_in_room = index.at[(t, loc)]
+                count        = len(people_in_room)
+                next_holder  = current_holder
+                action       = "保留"
+
+                if   count == 1: action = "独处(保留)"
+                elif count == 2:
+                    others      = [p for p in people_in_room if p != current_holder]
+                    next_holder = others[0]
+                    action      = f"交换 -> {next_holder}"
+                elif count >= 3: action = f"人多(保留)"
+
+                if count == 2:
+                    log.append({"Time": t, "Holder": next_holder,     "Room": loc, "Desc": action})
+                else:
+                    log.append({"Time": t, "Holder": current_holder,  "Room": loc, "Desc": action})
+
+                if t < self.TIMES[-1]:
+                    current_holder = next_holder
+
+        # validity: jewel must spawn by T3
+        spawn_condition = False
+        for entry in log:
+            if entry["Desc"] == "✨ 发现珠宝！" and entry["Time"] <= self.SPAWN_BY:
+                spawn_condition = True
+                break
+
+        return pd.DataFrame(log), spawn_condition
+
+    # ---- initial clues ----
+    def generate_initial_clues(self, board, solution_data, rng=random) -> list:
+        excluded_person = None
+        t1_row = solution_data[solution_data["Time"] == 1]
+        if not t1_row.empty:
+            row_data = t1_row.iloc[0]
+            if "发现珠宝" in str(row_data["Desc"]):
+                excluded_person = row_data["Holder"]
+
+        candidates = [c for c in self.CHARACTERS if c != excluded_person]
+        selected   = rng.sample(candidates, 3)
+        return [{"char": char, "room": board.loc[char, 1]} for char in selected]
+
+    # ---- GUI ----
+    def render_header(self, game):
+        st.info(f"💎 **目标：** 找出 **T{self.TIMES[-1]}** 结束后珠宝在谁手中！")
+
+    def build_solution_views(self, game) -> dict:
+        final = game.solution_data.iloc[-1]
+        return {
+            "flow":   game.solution_data,
+            "board":  game.board,
+            "answer": f"🏆 **最终答案**: 珠宝在 **{final['Holder']}** 手中，位于 **{final['Room']}**",
+        }
+
+    def render_solution_panel(self, game):
+        views = self.solution_views(game)
+        st.caption("随机种子: " + str(game.seed_val))
+        tab_ans_1, tab_ans_2 = st.tabs(["💎 珠宝流向", "🗺️ 位置表"])
+
+        with tab_ans_1:
+            st.dataframe(views["flow"], use_container_width=True, hide_index=True)
+            st.error(views["answer"])
+
+        with tab_ans_2:
+            st.dataframe(views["board"], use_container_width=True)
+            st.caption(f"行：角色 | 列：时间 (T1-T{self.TIMES[-1]})")
+
+
+# --------------------------------------------------------------------------
+# 3b.  Ritual — 祭祀仪式 (Cuzco 1450)  (easy & hard share one class)
+# --------------------------------------------------------------------------
+class RitualHandler(BaseModeHandler):
+    ICON        = "🎎"
+    CHARACTERS  = RITUAL_SHARMANS
+    ROOMS       = RITUAL_TERRAIN             # a ring: pace steps move forward around it
+    INVESTIG_LOCATION_LABEL = "选择房间"
+    INVESTIG_PERSON_LABEL   = "选择巫舞者"
+    INVESTIG_ROOM_LABEL     = "去过这个祭坛吗？"
+
+    PACE_GROUPS = [
+        ["111","112","113","222","123","133","122","223","233","333"],
+        ["1112","1113","1123","1133","1122"],
+        ["1222","1223","1233","1333","2223","2233","2333"],
+    ]
+
+    def __init__(self, mode_code: str, characters=None, rooms=None, times=None, pace_weights=None):
+        # mode_code: "ritual_easy" | "ritual_hard", or a variant code starting with one of them
+        super().__init__(mode_code, characters, rooms, times)
+        if pace_weights:
+            self.PACE_WEIGHTS = list(pace_weights)
+        elif self.MODE_CODE.startswith("ritual_easy"):
+            self.PACE_WEIGHTS = [100, 0, 0]
+        else:
+            self.PACE_WEIGHTS = [66, 20, 14]
+        paces = sum(len(group) for group, w in zip(self.PACE_GROUPS, self.PACE_WEIGHTS) if w)
+        if len(self.CHARACTERS) > paces:
+            raise ValueError(f"{self.MODE_CODE}: {len(self.CHARACTERS)} characters but only {paces} distinct paces")
+
+    @property
+    def INVESTIG_TIME_OPTIONS(self) -> list:
+        return self.TIMES[1:-1]              # T2-T5 only: first and last are not investigable
+
+    # ---- board generation ----
+    def generate_board(self, rng_instance) -> pd.DataFrame:
+        """rng_instance is the ScenarioGenerator; we attach ritual-specific state to it."""
+        rng_instance.ritual_patterns = {}
+        rng_instance.pace_list       = []
+
+        rooms = self.ROOMS
+        data  = {char: [] for char in self.CHARACTERS}
+
+        for char in self.CHARACTERS:
+            start_room   = rng_instance.rng.choice(rooms)
+            start_index  = rooms.index(start_room)
+            pattern      = self._generate_valid_pattern(rng_instance)
+            pattern_offset = rng_instance.rng.randint(0, len(pattern) - 1)
+
+            rng_instance.ritual_patterns[char] = {
+                "pattern":      pattern,
+                "start_offset": pattern_offset,
+                "start_room":   start_room
+            }
+
+            locs        = [start_room]          # T1
+            current_idx = start_index
+            cycle_len   = len(pattern)
+
+            for i in range(len(self.TIMES) - 1):
+                step_idx    = (pattern_offset + i) % cycle_len
+                steps       = pattern[step_idx]
+                current_idx = (current_idx + steps) % len(rooms)
+                locs.append(rooms[current_idx])
+
+            data[char] = locs
+
+        board = pd.DataFrame(data).T
+        board.columns = self.TIMES
+        return board
+
+    def _generate_valid_pattern(self, rng_instance) -> list:
+        base_weights = self.PACE_WEIGHTS            # per PACE_GROUPS entry
+        group_list   = self.PACE_GROUPS
+        while True:
+            group_selected = rng_instance.rng.choices(group_list, weights=base_weights, k=1)[0]
+            selection      = rng_instance.rng.choices(group_selected)
+            result         = list(map(int, selection[0]))
+            if result not in rng_instance.pace_list:
+                rng_instance.pace_list.append(result)
+                return result
+
+    # ---- solving ----
+    def solve(self, board: pd.DataFrame, rng=random):
+        # Ritual has no single "jewel" solution; always valid on first try.
+        # solution_data is unused in the ritual answer panel (board is shown directly).
+        index         = BoardIndex(board)
+        valid_options = []
+        for t in self.TIMES:
+            for r in self.ROOMS:
+                people = index.at.get((t, r), [])
+                if len(people) > 0:
+                    for p in people:
+                        valid_options.append({"Time": t, "Room": r, "Culprit": p})
+        if not valid_options:
+            return pd.DataFrame([]), True
+        truth = rng.choice(valid_options)
+        return pd.DataFrame([truth]), True
+
+    # ---- initial clues ----
+    def generate_initial_clues(self, board, solution_data, rng=random) -> list:
+        return [{"char": char, "room": board.loc[char, 1]} for char in self.CHARACTERS]
+
+    # ---- extra system log: pace info ----
+    def log_extra_system_clues(self, game) -> list:
+        pace_list = [str(pace) for pace in game.pace_list]
+        pace_list.sort(key=lambda x: (len(x), x))
+        pace_str = " , ".join(pace_list)
+        return [{
+            "time":    "00:00",
+            "player":  "系统",
+            "desc":    "发布舞步信息 (Pace)",
+            "public":  f"👣 {pace_str}",
+            "private": "所有玩家可见",
+            "owner":   "SYSTEM",
+            "type":    "warning"
+        }]
+
+    # ---- GUI ----
+    def render_header(self, game):
+        st.error(f"🎎 **目标：** 推出 **T{self.TIMES[-1]}** 时所有巫舞者的位置！")
+
+    def build_solution_views(self, game) -> dict:
+        t6_data = game.board[self.TIMES[-1]].sort_index()
+        lines   = [f"**{char.split(')')[0]})**: {room}" for char, room in t6_data.items()]
+
+        rows = []
+        for char, info in game.ritual_patterns.items():
+            base_pat   = info['pattern']
+            offset     = info['start_offset']
+            actual_pat = base_pat[offset:] + base_pat[:offset]
+            rows.append((actual_pat, {
+                "角色":       char,
+                "T1 位置":    info['start_room'],
+                "步频模式":   str(base_pat),
+                "偏移量":     offset,
+                "实际执行":   str(actual_pat),
+            }))
+        rows.sort(key=lambda r: (len(r[0]), r[0]))
+
+        return {
+            "board":    game.board,
+            "answer":   f"🏆 **最终答案**: {' | '.join(lines)}",
+            "patterns": pd.DataFrame([row for _, row in rows]),
+        }
+
+    def render_solution_panel(self, game):
+        views = self.solution_views(game)
+        st.caption("随机种子: " + str(game.seed_val))
+        tab_ans_1, tab_ans_2 = st.tabs(["🗺️ 位置表", "💃 祭祀步频"])
+
+        with tab_ans_1:
+            st.dataframe(views["board"], use_container_width=True)
+            st.error(views["answer"])
+
+        with tab_ans_2:
+            st.dataframe(views["patterns"], use_container_width=True, hide_index=True)
+
+    # ---- scratchpad layout ----
+    def scratchpad_rooms_order(self) -> list:
+        # first half forward, second half reversed (the ring folded in two)
+        half = len(self.ROOMS) // 2
+        return self.ROOMS[:half] + self.ROOMS[half:][::-1]
+
+
+# --------------------------------------------------------------------------
+# 3c.  SD Engineer — 圣地亚哥的天才工程师
+# --------------------------------------------------------------------------
+class SDEngineerHandler(BaseModeHandler):
+    MODE_CODE   = "sd_engineer"
+    ICON        = "👷‍♂️"
+    CHARACTERS  = SD_CHARACTERS
+    ROOMS       = SD_AREA
+    GRAPH       = SD_GRAPH
+    WALKS       = SD_WALKS
+    INVESTIG_LOCATION_LABEL = "选择地点"
+    INVESTIG_PERSON_LABEL   = "选择人物"
+    INVESTIG_ROOM_LABEL     = "去过这个地区吗？"
+
+    # ---- board generation ----
+    # Every engineer drives along GRAPH: a uniform start area, then one
+    # uniform neighbouring area per time step.
+    def generate_board(self, rng_instance) -> pd.DataFrame:
+        paths = self.WALKS.walks(rng_instance.rng, len(self.CHARACTERS), len(self.TIMES))
+        data  = {char: self.WALKS.names(path) for char, path in zip(self.CHARACTERS, paths)}
+
+        board = pd.DataFrame(data).T
+        board.columns = self.TIMES
+        return board
+
+    # ---- solving ----
+    def solve(self, board: pd.DataFrame, rng=random):
+        index         = BoardIndex(board)
+        valid_options = []
+        for t in self.TIMES:
+            for r in self.ROOMS:
+                people = index.at.get((t, r), [])
+                if len(people) > 0:
+                    for p in people:
+                        valid_options.append({"Time": t, "Room": r, "Culprit": p})
+        if not valid_options:
+            return pd.DataFrame([]), True
+        truth = rng.choice(valid_options)
+        return pd.DataFrame([truth]), True
+
+    # ---- initial clues ----
+    def generate_initial_clues(self, board, solution_data, rng=random) -> list:
+        return [{"char": char, "room": board.loc[char, 1]} for char in self.CHARACTERS]
+
+    # ---- extra system log: the road map players deduce routes from ----
+    def log_extra_system_clues(self, game) -> list:
+        roads = " | ".join(f"{area} → {' / '.join(self.GRAPH[area])}" for area in self.ROOMS)
+        return [{
+            "time":    "00:00",
+            "player":  "系统",
+            "desc":    "发布道路信息 (Map)",
+            "public":  f"🛣️ {roads}",
+            "private": "所有玩家可见",
+            "owner":   "SYSTEM",
+            "type":    "warning"
+        }]
+
+    # ---- GUI ----
+    def render_header(self, game):
+        st.error("👷‍♂️ **目标：** 找出炸毁SD桥梁的工程师！")
+
+    def build_solution_views(self, game) -> dict:
+        t6_data = game.board[self.TIMES[-1]].sort_index()
+        lines   = [f"**{char.split(')')[0]})**: {room}" for char, room in t6_data.items()]
+
+        routes = pd.DataFrame([{
+            "角色":   char,
+            "路线":   " → ".join(game.board.loc[char]),
+        } for char in self.CHARACTERS])
+
+        return {
+            "board":  game.board,
+            "answer": f"🏆 **最终答案**: {' | '.join(lines)}",
+            "routes": routes,
+        }
+
+    def render_solution_panel(self, game):
+        views = self.solution_views(game)
+        st.caption("随机种子: " + str(game.seed_val))
+        tab_ans_1, tab_ans_2 = st.tabs(["🗺️ 位置表", "🚗 行车路线"])
+
+        with tab_ans_1:
+            st.dataframe(views["board"], use_container_width=True)
+            st.error(views["answer"])
+
+        with tab_ans_2:
+            st.dataframe(views["routes"], use_container_width=True, hide_index=True)
+
+
+# ==============================================================================
+# 4. Mode Registry  —  single source of truth for "which handler runs when"
+# ==============================================================================
+
+MODE_HANDLERS: dict[str, BaseModeHandler] = {
+    "jewel":        JewelHandler(),
+    "ritual_easy":  RitualHandler("ritual_easy"),
+    "ritual_hard":  RitualHandler("ritual_hard"),
+    "sd_engineer":  SDEngineerHandler(),
+}
+
+# sidebar radio label -> mode_code (dict order = display order)
+MODE_LABELS: dict[str, str] = {
+    "💎 名伶的珠宝 (Paris 1920)":      "jewel",
+    "💃 祭祀仪式-简单 (Cuzco 1450)":   "ritual_easy",
+    "🎎 祭祀仪式-复杂 (Cuzco 1450)":   "ritual_hard",
+    "👷‍♂️ 圣地亚哥的天才工程师":        "sd_engineer",
+}
+
+def get_handler(mode_code: str) -> BaseModeHandler:
+    return MODE_HANDLERS[mode_code]
+
+
+def make_variant(mode_code: str, characters=12, rooms=10, times=10, seed=0) -> BaseModeHandler:
+    """A resized copy of a registered mode, e.g. 12 characters x 10 rooms x 10 times,
+    for offline analysis and benchmarks (scalebench, exact).
+
+    The mode's own characters and rooms come first, then numbered extras
+    ("(G7) Guest 7", "牌坊2"); walk modes that outgrow their map get a ring
+    with random chords (graphwalk.ring_graph, seeded by seed).  Variants
+    cannot be played: they are not registered with get_handler, so the
+    page, GlobalGameState, the API and tournaments never serve them, and
+    codec / archive reject their boards.  Build games with
+    ScenarioGenerator(seed, handler=...).  Sizes a mode cannot generate
+    raise ValueError."""
+    base = get_handler(mode_code)
+    if characters < 1 or rooms < 2 or times < 2:
+        raise ValueError(f"{mode_code}: need at least 1 character, 2 rooms and 2 times, "
+                         f"got {characters}x{rooms}x{times}")
+    if isinstance(base, JewelHandler) and characters < 4:
+        raise ValueError(f"{mode_code}: need at least 4 characters (3 initial clues besides the finder), "
+                         f"got {characters}")
+    if isinstance(base, RitualHandler) and times < 3:
+        raise ValueError(f"{mode_code}: need at least 3 times (first and last are not investigable), got {times}")
+    chars = list(base.CHARACTERS[:characters]) + [f"(G{i}) Guest {i}"
+                                                  for i in range(len(base.CHARACTERS) + 1, characters + 1)]
+    names = list(base.ROOMS[:rooms]) + [f"{base.ROOMS[i % len(base.ROOMS)]}{i // len(base.ROOMS) + 1}"
+                                        for i in range(len(base.ROOMS), rooms)]
+    code  = f"{mode_code}_{characters}x{rooms}x{times}"
+
+    if isinstance(base, RitualHandler):
+        return RitualHandler(code, chars, names, times)
+    graph = base.GRAPH if names == base.ROOMS else ring_graph(names, len(names) // 2, random.Random(seed))
+    return type(base)(code, chars, names, times, graph)
+
+
+@st.cache_resource(max_entries=512, show_spinner=False)
+def _cached_solution_views(mode_code: str, seed_val, _handler, _game) -> dict:
+    # Keyed by (mode, seed) only; the game object itself is not hashed.
+    # Cached objects are shared across sessions and must be treated as read-only.
+    return _handler.build_solution_views(_game)
+
+
+# ==============================================================================
+# 5. ScenarioGenerator  —  now thin; delegates everything to the active handler
+# ==============================================================================
+
+class ScenarioGenerator:
+    def __init__(self, seed_val, mode="jewel", handler=None):
+        # handler: an unregistered handler (make_variant) to generate with instead of mode's
+        self.seed_val      = seed_val
+        self.mode          = mode if handler is None else handler.MODE_CODE
+        self.initial_clues = []
+        self.query         = {}
+        self.handler       = handler or get_handler(mode)
+        self.rng           = random.Random(seed_val)   # private stream: same sequence as random.seed(seed_val)
+
+        max_attempts = 1000
+
+        for i in range(max_attempts):
+            self.board = self.handler.generate_board(self)
+
+            self.solution_data, is_valid = self.handler.solve(self.board, self.rng)
+            if is_valid:
+                break
+            # jewel: retries until spawn_condition is met (jewel found by T3)
+            # ritual / sd: solve() always returns True → breaks on first iteration
+
+        self.initial_clues = self.handler.generate_initial_clues(self.board, self.solution_data, self.rng)
+
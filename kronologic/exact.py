@@ -0,0 +1,506 @@
+"""Exact generator statistics by dynamic programming, for tuning mode parameters.
+
+Instead of generating many games and counting, each mode's generator is
+turned into a small Markov chain and its distribution is pushed forward one
+time step at a time:
+
+* Jewel / SD Engineer — characters are i.i.d. walks on the room graph, so
+  the vector of how many stand in each room is itself a Markov chain (462
+  states for 6 characters in 6 rooms).  Jewel adds the holder's room and the
+  hand-off count; once the jewel is found, a hand-over swaps who holds it but
+  not where, so (others' counts, holder room, hand-offs) stays Markov.
+  Generation retries until the jewel is found by SPAWN_BY, so every Jewel
+  figure is conditioned on that, including occupancy before the find (via a
+  backward table of "still found in time" probabilities).
+* Ritual — pace patterns are drawn without replacement by rejection, which
+  only depends on how many patterns of each group are used: a DP over those
+  group counts gives every character's pattern distribution.  Start rooms
+  are uniform on the ring, so occupancy is uniform whatever the weights;
+  what the weights change is the pace list and how often a character
+  returns to a room.
+
+The count-vector transitions are compiled once per (graph, number of
+characters) and cached; after that a query takes a few milliseconds.  They
+are stored sparse, and the work and memory of a chain grow with its number
+of transitions (count vectors x reachable successors), which MAX_STATES and
+MAX_TRANSITIONS cap.
+
+    python -m kronologic.exact --mode jewel --spawn-by 2
+    python -m kronologic.exact --mode ritual_hard --weights 50,30,20
+    python -m kronologic.exact --mode jewel --check 20000        # against sampled boards
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from fractions import Fraction
+from types import SimpleNamespace
+
+import numpy as np
+
+from kronologic.engine import MODE_HANDLERS, BoardIndex, JewelHandler, RitualHandler, get_handler
+
+MAX_STATES      = 20_000                    # count vectors per chain level
+MAX_TRANSITIONS = 50_000_000                # transition entries built per level, before merging duplicates
+MERGE_BATCH     = 1 << 20                   # entries merged at once; bounds the working memory of a level
+
+
+# ==============================================================================
+# Count-vector chains
+# ==============================================================================
+
+class Transitions:
+    """Sparse square transition matrix: COO entries sorted by row, duplicates merged."""
+    __slots__ = ("size", "rows", "cols", "vals", "indptr")
+
+    def __init__(self, size, rows, cols, vals):
+        self.size   = size
+        self.rows   = rows
+        self.cols   = cols
+        self.vals   = vals
+        self.indptr = np.searchsorted(rows, np.arange(size + 1))      # row i = entries indptr[i]:indptr[i+1]
+
+    def forward(self, x):
+        """x @ T: a distribution over states (one column per extra axis of x) one step later."""
+        if x.ndim > 1:
+            out = np.zeros((self.size,) + x.shape[1:])
+            for j in np.nonzero(x.any(axis=0))[0]:                   # all-zero columns stay zero
+                out[:, j] = self.forward(x[:, j])
+            return out
+        return np.bincount(self.cols, weights=self.vals * x[self.rows], minlength=self.size)
+
+    def backward(self, x):
+        """T @ x: the expectation of x one step later, per state."""
+        return np.bincount(self.rows, weights=self.vals * x[self.cols], minlength=self.size)
+
+
+class OccupancyChain:
+    """Markov chain of per-room counts of `walkers` i.i.d. walkers on a WalkGraph.
+
+    Level k's transitions are built from level k - 1's: a count vector
+    moves like its parent (one walker fewer) plus that walker's own step.
+    Only the last two levels are kept (``states``, ``matrix`` and ``start``
+    are keyed by level); they are all Jewel needs."""
+
+    def __init__(self, walks, walkers):
+        rooms = len(walks.nodes)
+        if math.comb(walkers + rooms - 1, rooms - 1) > MAX_STATES:
+            raise ValueError(f"{walkers} walkers in {rooms} rooms: too many count vectors for an exact chain")
+        eye         = np.eye(rooms, dtype=np.int64)
+        self.walks  = walks
+        self.states = {0: np.zeros((1, rooms), dtype=np.int64)}       # level -> (S, rooms) counts
+        self.matrix = {0: Transitions(1, np.zeros(1, np.int32), np.zeros(1, np.int32), np.ones(1))}
+        self.start  = {0: np.ones(1)}                                  # level -> uniform-start distribution
+
+        for k in range(1, walkers + 1):
+            prev   = self.states[k - 1]
+            before = self.matrix[k - 1]
+            level  = sorted({tuple(v + eye[j]) for v in prev for j in range(rooms)}, reverse=True)
+            index  = {v: i for i, v in enumerate(level)}
+            add    = [np.array([index[tuple(v + eye[j])] for v in prev]) for j in range(rooms)]
+            states = np.array(level, dtype=np.int64)
+            size   = len(level)
+
+            start = np.zeros(size)
+            for j in range(rooms):
+                start[add[j]] += self.start[k - 1] / rooms
+
+            # each vector = its parent (one walker removed from its last occupied room) + that walker
+            last   = rooms - 1 - np.argmax(states[:, ::-1] > 0, axis=1)
+            parent = np.empty(size, dtype=np.int64)
+            for room in range(rooms):
+                mine = last[add[room]] == room
+                parent[add[room][mine]] = np.nonzero(mine)[0]
+
+            # duplicates only occur within a row, so entries are merged a batch of rows at a time
+            keys, vals, built = [], [], 0
+            for room in range(rooms):
+                ids = np.nonzero(last == room)[0]
+                if not len(ids):
+                    continue
+                moves  = walks.moves[room]
+                counts = (before.indptr[parent[ids] + 1] - before.indptr[parent[ids]]) * len(moves)
+                built += int(counts.sum())
+                if built > MAX_TRANSITIONS:
+                    raise ValueError(f"{walkers} walkers in {rooms} rooms: too many transitions for an exact chain")
+                cuts = np.searchsorted(np.cumsum(counts), np.arange(MERGE_BATCH, counts.sum(), MERGE_BATCH))
+                for batch in np.split(ids, cuts):
+                    if len(batch):
+                        found, merged = self._entries(before, batch, parent[batch], add, moves, size)
+                        keys.append(found)
+                        vals.append(merged)
+            keys  = np.concatenate(keys)
+            order = np.argsort(keys)
+            keys, vals = keys[order], np.concatenate(vals)[order]
+
+            self.states[k] = states
+            self.matrix[k] = Transitions(size, (keys // size).astype(np.int32), (keys % size).astype(np.int32), vals)
+            self.start[k]  = start
+            for old in (self.states, self.matrix, self.start):
+                old.pop(k - 2, None)
+
+    @staticmethod
+    def _entries(before, ids, parents, add, moves, size):
+        """Merged (row * size + col, probability) entries of rows ids, whose walker moves from one room."""
+        first  = before.indptr[parents]
+        counts = before.indptr[parents + 1] - first
+        pos    = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        rows   = np.repeat(ids, counts) * size
+        raw    = np.concatenate([rows + add[dest][before.cols[pos]] for dest in moves])
+        keys, merged = np.unique(raw, return_inverse=True)
+        return keys, np.bincount(merged, weights=np.tile(before.vals[pos] / len(moves), len(moves)))
+
+
+_CHAINS = {}
+
+
+def chain(walks, walkers) -> OccupancyChain:
+    """OccupancyChain for a WalkGraph, compiled on first use."""
+    key = (id(walks), walkers)
+    if key not in _CHAINS:
+        _CHAINS[key] = OccupancyChain(walks, walkers)
+    return _CHAINS[key]
+
+
+def _table(handler, expected, p_empty) -> dict:
+    return {
+        "times":    handler.TIMES,
+        "rooms":    handler.ROOMS,
+        "expected": [[float(x) for x in row] for row in expected],     # [time][room] mean occupants
+        "p_empty":  [[float(x) for x in row] for row in p_empty],      # [time][room] P(nobody there)
+    }
+
+
+# ==============================================================================
+# Jewel
+# ==============================================================================
+
+def jewel(handler=None, spawn_by=None, spawn_room=None) -> dict:
+    """Exact Jewel statistics for boards the generator accepts (jewel found by spawn_by).
+
+    Characters are exchangeable, so the final holder is each character with
+    probability 1 / len(CHARACTERS); "holder_room" is where the jewel ends."""
+    handler  = handler or get_handler("jewel")
+    spawn_by = handler.SPAWN_BY if spawn_by is None else spawn_by
+    spawn    = handler.ROOMS.index(spawn_room or handler.SPAWN_ROOM)
+    n_times  = len(handler.TIMES)
+    n_rooms  = len(handler.ROOMS)
+    walkers  = len(handler.CHARACTERS)
+    moves    = handler.WALKS.moves
+
+    occ   = chain(handler.WALKS, walkers)
+    full  = occ.states[walkers]                # all characters, before the find
+    rest  = occ.states[walkers - 1]            # everyone but the holder, after it
+    T_all, T_rest = occ.matrix[walkers], occ.matrix[walkers - 1]
+
+    hit      = full[:, spawn] == 1             # exactly one character in the spawn room: found
+    rest_ix  = {tuple(v): i for i, v in enumerate(rest)}
+    hit_rest = np.array([rest_ix[tuple(v - np.eye(n_rooms, dtype=np.int64)[spawn])] for v in full[hit]])
+    alone    = [rest[:, h] == 1 for h in range(n_rooms)]               # holder meets exactly one other
+
+    U      = occ.start[walkers].copy()         # not found yet
+    F      = np.zeros((n_rooms, len(rest), n_times))                  # [holder room, others, hand-offs]
+    found  = np.zeros(n_times)
+    U_by_t, F_by_t = [], []
+
+    for step in range(n_times):
+        t = step + 1
+        if step:
+            moved = np.zeros_like(F)
+            for h in range(n_rooms):
+                if F[h].any():
+                    spread = T_rest.forward(F[h])
+                    for dest in moves[h]:
+                        moved[dest] += spread / len(moves[h])
+            F = moved
+            for h in range(n_rooms):
+                swap = F[h][alone[h]]
+                F[h][alone[h]] = np.concatenate([np.zeros((len(swap), 1)), swap[:, :-1]], axis=1)
+            U = T_all.forward(U)
+        if t <= spawn_by:
+            np.add.at(F[spawn][:, 0], hit_rest, U[hit])
+            found[step] = U[hit].sum()
+            U = np.where(hit, 0.0, U)
+        else:
+            U = np.zeros_like(U)               # never found in time: the generator retries
+        U_by_t.append(U)
+        F_by_t.append(F.sum(axis=2))
+
+    p_valid = found.sum()
+    if p_valid == 0:
+        raise ValueError(f"the jewel can never be found by T{spawn_by}")
+
+    # backward: P(found by spawn_by | still hidden at t with counts n)
+    later = [np.zeros(len(full)) for _ in range(n_times)]
+    for step in range(min(spawn_by, n_times) - 2, -1, -1):
+        later[step] = T_all.backward(np.where(hit, 1.0, later[step + 1]))
+
+    expected = np.zeros((n_times, n_rooms))
+    p_empty  = np.zeros((n_times, n_rooms))
+    for step in range(n_times):
+        hidden = U_by_t[step] * later[step]
+        expected[step] += hidden @ full
+        p_empty[step]  += hidden @ (full == 0)
+        for h in range(n_rooms):
+            mass = F_by_t[step][h]
+            expected[step]    += mass @ rest
+            expected[step][h] += mass.sum()
+            empty = mass @ (rest == 0)
+            empty[h] = 0.0
+            p_empty[step] += empty
+    expected /= p_valid
+    p_empty  /= p_valid
+
+    final = F.sum(axis=1)                      # [holder room, hand-offs]
+    return {
+        "mode":        handler.MODE_CODE,
+        "spawn_room":  handler.ROOMS[spawn],
+        "spawn_by":    spawn_by,
+        "p_valid":     float(p_valid),
+        "attempts":    float(1 / p_valid),     # expected boards generated per game
+        "spawn_time":  {t: float(found[t - 1] / p_valid) for t in handler.TIMES if found[t - 1]},
+        "handoffs":    {k: float(p / p_valid) for k, p in enumerate(final.sum(axis=0)) if p > 1e-15},
+        "holder_room": {room: float(final[h].sum() / p_valid) for h, room in enumerate(handler.ROOMS)},
+        "occupancy":   _table(handler, expected, p_empty),
+    }
+
+
+# ==============================================================================
+# SD Engineer (and any unconditioned walk mode)
+# ==============================================================================
+
+def walk_occupancy(handler) -> dict:
+    """Occupancy of independent uniform-start walks: one walker's marginal, C times."""
+    n_rooms = len(handler.ROOMS)
+    walkers = len(handler.CHARACTERS)
+    step    = np.zeros((n_rooms, n_rooms))
+    for room, moves in enumerate(handler.WALKS.moves):
+        for dest in moves:
+            step[room, dest] += 1 / len(moves)
+    p = np.full(n_rooms, 1 / n_rooms)
+    marginals = []
+    for _ in handler.TIMES:
+        marginals.append(p)
+        p = p @ step
+    marginals = np.array(marginals)
+    return {"mode": handler.MODE_CODE,
+            "occupancy": _table(handler, walkers * marginals, (1 - marginals) ** walkers)}
+
+
+# ==============================================================================
+# Ritual
+# ==============================================================================
+
+def pattern_marginals(groups, weights, draws) -> list:
+    """Per draw i, {pattern: P(draw i is pattern)} for rejection sampling without replacement.
+
+    A pattern of group g is drawn with weight w_g / |g| among the unused ones;
+    by symmetry inside a group only the used count per group matters."""
+    sizes  = [len(g) for g in groups]
+    states = {tuple(0 for _ in groups): Fraction(1)}
+    out    = []
+    for _ in range(draws):
+        per_group = [Fraction(0)] * len(groups)
+        nxt       = Counter()
+        for used, p in states.items():
+            free  = [Fraction(w, n) * (n - u) for w, n, u in zip(weights, sizes, used)]
+            total = sum(free)
+            if not total:
+                raise ValueError("more characters than patterns with a non-zero weight")
+            for g, f in enumerate(free):
+                if f:
+                    per_group[g] += p * f / total
+                    nxt[used[:g] + (used[g] + 1,) + used[g + 1:]] += p * f / total
+        states = nxt
+        out.append({pattern: per_group[g] / sizes[g] for g, group in enumerate(groups) for pattern in group
+                    if per_group[g]})
+    return out
+
+
+def ritual(handler=None, weights=None) -> dict:
+    handler = handler or get_handler("ritual_hard")
+    weights = list(weights or handler.PACE_WEIGHTS)
+    groups  = handler.PACE_GROUPS
+    n_rooms = len(handler.ROOMS)
+    n_times = len(handler.TIMES)
+    draws   = pattern_marginals(groups, weights, len(handler.CHARACTERS))
+
+    # visits of one character to one room ("去过此处 k 次"), over start rooms and offsets
+    visits   = Counter()
+    distinct = 0.0
+    in_list  = Counter()
+    for marginal in draws:
+        for pattern, p in marginal.items():
+            p = float(p)
+            in_list[pattern] += p
+            steps = [int(c) for c in pattern]
+            for offset in range(len(steps)):
+                pos, seen = 0, Counter({0: 1})
+                for i in range(n_times - 1):
+                    pos = (pos + steps[(offset + i) % len(steps)]) % n_rooms
+                    seen[pos] += 1
+                share = p / len(steps)
+                for x in range(n_rooms):
+                    visits[seen[x]] += share / n_rooms
+                distinct += share * len(seen)
+    chars = len(handler.CHARACTERS)
+
+    # start rooms are uniform on the ring, so every (time, room) is 1 / rooms per character
+    uniform = np.full((n_times, n_rooms), 1 / n_rooms)
+    return {
+        "mode":           handler.MODE_CODE,
+        "weights":        weights,
+        "group_share":    [float(sum(in_list[p] for p in group) / chars) for group in groups],
+        "pace_list":      {p: float(v) for p, v in sorted(in_list.items(), key=lambda kv: -kv[1])},
+        "visits":         {k: float(v / chars) for k, v in sorted(visits.items())},
+        "distinct_rooms": float(distinct / chars),
+        "occupancy":      _table(handler, chars * uniform, (1 - uniform) ** chars),
+    }
+
+
+def analyze(mode, handler=None, **params) -> dict:
+    """Exact statistics of one mode; params are jewel(...) / ritual(...) overrides."""
+    handler = handler or get_handler(mode)
+    if isinstance(handler, JewelHandler):
+        return jewel(handler, **params)
+    if isinstance(handler, RitualHandler):
+        return ritual(handler, **params)
+    return walk_occupancy(handler)
+
+
+# ==============================================================================
+# Regression check against sampled boards
+# ==============================================================================
+
+def sample(handler, boards, seed=0) -> dict:
+    """The same statistics estimated from `boards` generated boards (accepted ones only, for Jewel)."""
+    rng      = random.Random(seed)
+    counts   = Counter()
+    occupied = np.zeros((len(handler.TIMES), len(handler.ROOMS)))
+    accepted = 0
+    for _ in range(boards):
+        gen   = SimpleNamespace(rng=rng)
+        board = handler.generate_board(gen)
+        solution, valid = handler.solve(board, rng)
+        if not valid:
+            continue
+        accepted += 1
+        index = BoardIndex(board)
+        for step, t in enumerate(handler.TIMES):
+            for h, room in enumerate(handler.ROOMS):
+                occupied[step, h] += len(index.at.get((t, room), ()))
+        if isinstance(handler, JewelHandler):
+            counts["handoffs", int(solution["Desc"].astype(str).str.startswith("交换").sum())] += 1
+            counts["holder_room", solution.iloc[-1]["Room"]] += 1
+        if isinstance(handler, RitualHandler):
+            for char in handler.CHARACTERS:
+                for room in handler.ROOMS:
+                    counts["visits", len(index.visits.get((char, room), ()))] += 1
+            for pattern in gen.pace_list:
+                for g, group in enumerate(handler.PACE_GROUPS):
+                    if "".join(map(str, pattern)) in group:
+                        counts["group", g] += 1
+    return {"boards": boards, "accepted": accepted, "counts": counts, "occupied": occupied}
+
+
+def check(mode, boards=20000, seed=0, handler=None, **params) -> list:
+    """[(quantity, exact, sampled, z)]: exact proportions/means against a sample of boards."""
+    handler = handler or get_handler(mode)
+    exact   = analyze(mode, handler, **params)
+    if params:                                 # sample with the same parameter overrides
+        handler = (JewelHandler(handler.MODE_CODE, handler.CHARACTERS, handler.ROOMS, len(handler.TIMES),
+                                handler.GRAPH, params.get("spawn_room"), params.get("spawn_by"))
+                   if isinstance(handler, JewelHandler) else
+                   RitualHandler(handler.MODE_CODE, handler.CHARACTERS, handler.ROOMS, len(handler.TIMES),
+                                 params.get("weights")))
+    got = sample(handler, boards, seed)
+    n   = got["accepted"]
+    rows = []
+
+    def proportion(name, p, hits, trials):
+        se = math.sqrt(max(p * (1 - p), 1e-12) / trials)
+        rows.append((name, p, hits / trials, (hits / trials - p) / se))
+
+    if "p_valid" in exact:
+        proportion("p_valid", exact["p_valid"], n, boards)
+        for k, p in exact["handoffs"].items():
+            proportion(f"handoffs={k}", p, got["counts"]["handoffs", k], n)
+        for room, p in exact["holder_room"].items():
+            proportion(f"holder_room={room}", p, got["counts"]["holder_room", room], n)
+    if "group_share" in exact:
+        chars = len(handler.CHARACTERS)
+        for g, p in enumerate(exact["group_share"]):
+            proportion(f"group{g + 1}_share", p, got["counts"]["group", g], n * chars)
+        for k, p in exact["visits"].items():
+            proportion(f"visits={k}", p, got["counts"]["visits", k], n * chars * len(handler.ROOMS))
+
+    # occupancy: a per-slot count of up to C characters; bound its sd by C / 2
+    chars = len(handler.CHARACTERS)
+    se    = (chars / 2) / math.sqrt(n)
+    table = exact["occupancy"]["expected"]
+    worst = max(((abs(got["occupied"][i][j] / n - table[i][j]), i, j)
+                 for i in range(len(table)) for j in range(len(table[0]))))
+    _, i, j = worst
+    rows.append((f"occupancy T{handler.TIMES[i]} {handler.ROOMS[j]} (worst slot)", table[i][j],
+                 got["occupied"][i][j] / n, (got["occupied"][i][j] / n - table[i][j]) / se))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode",       choices=list(MODE_HANDLERS), default="jewel")
+    parser.add_argument("--spawn-by",   type=int, default=None, help="Jewel: latest time the jewel may appear")
+    parser.add_argument("--spawn-room", default=None, help="Jewel: room the jewel appears in")
+    parser.add_argument("--weights",    default=None, help="Ritual: pace group weights, e.g. 66,20,14")
+    parser.add_argument("--json",       action="store_true", help="print the full result as JSON")
+    parser.add_argument("--check",      type=int, default=0, metavar="BOARDS",
+                        help="also sample this many boards and compare (exit 1 beyond --max-z)")
+    parser.add_argument("--max-z",      type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    params = {}
+    if args.spawn_by is not None:
+        params["spawn_by"] = args.spawn_by
+    if args.spawn_room:
+        params["spawn_room"] = args.spawn_room
+    if args.weights:
+        params["weights"] = [int(w) for w in args.weights.split(",")]
+
+    t0 = time.perf_counter()
+    try:
+        analyze(args.mode, **params)
+        t1 = time.perf_counter()
+        result = analyze(args.mode, **params)
+    except ValueError as e:
+        parser.error(str(e))
+    t2 = time.perf_counter()
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=1))
+    else:
+        for key, value in result.items():
+            if key != "occupancy":
+                print(f"{key:<15}{value}")
+        occ = result["occupancy"]
+        print("expected occupants  " + " ".join(f"{room:>8}" for room in occ["rooms"]))
+        for t, row in zip(occ["times"], occ["expected"]):
+            print(f"  T{t:<17}" + " ".join(f"{x:>8.3f}" for x in row))
+    print(f"first call {1000 * (t1 - t0):.1f} ms (compiles chains), then {1000 * (t2 - t1):.1f} ms",
+          file=sys.stderr)
+
+    if args.check:
+        rows = check(args.mode, args.check, **params)
+        print(f"\n{'quantity':<40}{'exact':>10}{'sampled':>10}{'z':>8}")
+        for name, exact, got, z in rows:
+            print(f"{name:<40}{exact:>10.4f}{got:>10.4f}{z:>8.2f}")
+        if any(abs(z) > args.max_z for *_, z in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
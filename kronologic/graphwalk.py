@@ -0,0 +1,137 @@
+"""Random walks over a room graph, compiled once into integer transition tables.
+
+A WalkGraph turns an adjacency dict (room -> neighbouring rooms) into tuples of
+node indices at import time; sampling then only indexes tuples.  An
+unconstrained walk picks a uniform start room and a uniform neighbour at each
+step, drawing from the rng exactly like ``rng.choice`` on the original lists,
+so boards generated through it keep their seeds.
+
+Walks can be constrained (``At``, ``Avoid``, ``VisitBy``).  Constrained walks
+are drawn from the same random-walk distribution conditioned on the
+constraints holding, using a backward table of completion probabilities that
+is compiled once per (constraints, length) — no rejection loop.
+
+Times in constraints are 1-based, matching TIMES (T1 is the start room).
+"""
+
+from collections import namedtuple
+
+At      = namedtuple("At",      "room time")     # must be in room at time
+Avoid   = namedtuple("Avoid",   "room time")     # must not be in room at time
+VisitBy = namedtuple("VisitBy", "room time")     # must have been in room at some T <= time
+
+
+def ring_graph(nodes, chords, rng) -> dict:
+    """Adjacency dict of a ring over nodes plus `chords` random extra edges.
+
+    Connected, undirected and without self-loops; used for maps larger than
+    the hand-drawn ones (mean degree 2 + 2 * chords / len(nodes))."""
+    nodes = list(nodes)
+    n     = len(nodes)
+    if n < 2:
+        raise ValueError(f"a ring needs at least 2 nodes, got {n}")
+    edges = {frozenset((i, (i + 1) % n)) for i in range(n)}
+    limit = n * (n - 1) // 2
+    while len(edges) < min(limit, n + chords):
+        a, b = rng.sample(range(n), 2)
+        edges.add(frozenset((a, b)))
+    adjacency = {room: [] for room in nodes}
+    for a, b in sorted(tuple(sorted(e)) for e in edges):
+        adjacency[nodes[a]].append(nodes[b])
+        adjacency[nodes[b]].append(nodes[a])
+    return adjacency
+
+
+class WalkGraph:
+    def __init__(self, adjacency: dict, nodes=None):
+        self.nodes = list(nodes) if nodes is not None else list(adjacency)
+        self.index = {room: i for i, room in enumerate(self.nodes)}
+        # moves[i] = neighbour indices of node i, in the adjacency list's order
+        self.moves = tuple(tuple(self.index[m] for m in adjacency[room]) for room in self.nodes)
+        self.starts = tuple(range(len(self.nodes)))
+        self._plans = {}                       # (constraints, length) -> compiled completion table
+
+    # ---- sampling ----
+    def walk(self, rng, length, constraints=()) -> list:
+        """One walk of `length` node indices."""
+        if constraints:
+            return self._walk_constrained(rng, self._plan(tuple(constraints), length))
+        moves = self.moves
+        cur   = rng.choice(self.starts)
+        path  = [cur]
+        for _ in range(length - 1):
+            cur = rng.choice(moves[cur])
+            path.append(cur)
+        return path
+
+    def walks(self, rng, count, length, constraints=None) -> list:
+        """count walks drawn in order from one rng.  constraints is either one
+        sequence applied to every walk, or a per-walk list of sequences."""
+        if not constraints:
+            return [self.walk(rng, length) for _ in range(count)]
+        if isinstance(constraints[0], (At, Avoid, VisitBy)):
+            constraints = [constraints] * count
+        return [self.walk(rng, length, constraints[i]) for i in range(count)]
+
+    def names(self, path) -> list:
+        return [self.nodes[i] for i in path]
+
+    # ---- constrained walks ----
+    def _plan(self, constraints, length):
+        key  = (constraints, length)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = self._compile(constraints, length)
+        return plan
+
+    def _compile(self, constraints, length):
+        n       = len(self.nodes)
+        allowed = [[True] * n for _ in range(length)]
+        visits  = []                           # (node, last position) per VisitBy, one bit each
+        for c in constraints:
+            node, pos = self.index[c.room], c.time - 1
+            if not 0 <= pos < length:
+                raise ValueError(f"constraint time out of range: {c}")
+            if isinstance(c, At):
+                allowed[pos] = [i == node for i in range(n)]
+            elif isinstance(c, Avoid):
+                allowed[pos][node] = False
+            else:
+                visits.append((node, pos))
+
+        # bits[p][i]: requirements satisfied by standing on node i at position p
+        bits = [[sum(1 << k for k, (node, last) in enumerate(visits) if node == i and p <= last)
+                 for i in range(n)] for p in range(length)]
+        full = (1 << len(visits)) - 1
+
+        # done[p][i][s]: probability that a walk standing on i at p, having satisfied
+        # the requirement set s (including p), completes without breaking a constraint
+        states = 1 << len(visits)
+        done   = [[[0.0] * states for _ in range(n)] for _ in range(length)]
+        for i in range(n):
+            if allowed[length - 1][i]:
+                done[length - 1][i][full] = 1.0
+        for p in range(length - 2, -1, -1):
+            for i in range(n):
+                if not allowed[p][i]:
+                    continue
+                moves = self.moves[i]
+                for s in range(states):
+                    done[p][i][s] = sum(done[p + 1][m][s | bits[p + 1][m]] for m in moves) / len(moves)
+
+        start = [done[0][i][bits[0][i]] for i in range(n)]
+        if not any(start):
+            raise ValueError(f"no walk of length {length} satisfies {list(constraints)}")
+        return start, done, bits
+
+    def _walk_constrained(self, rng, plan):
+        start, done, bits = plan
+        cur  = rng.choices(self.starts, weights=start)[0]
+        sat  = bits[0][cur]
+        path = [cur]
+        for p in range(1, len(done)):
+            moves = self.moves[cur]
+            cur   = rng.choices(moves, weights=[done[p][m][sat | bits[p][m]] for m in moves])[0]
+            sat  |= bits[p][cur]
+            path.append(cur)
+        return path
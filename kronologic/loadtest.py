@@ -0,0 +1,269 @@
+"""Simulated-player load generator and latency harness.
+
+Spins up N rooms with M bot players each and drives a GlobalGameState the same
+way the Streamlit page does: every bot joins its room, then issues random
+"调查地点" / "调查人物" queries, polls the room log and occasionally reveals the
+answer.  Everything runs in-process, so the numbers describe the game server
+itself on this machine.
+
+Rate limits are off unless ``--limits`` is given; ``--abusers`` adds scripted
+clients that hammer "开启新局" / "清空记录" in their own rooms, to check that the
+honest rooms' latency stays flat.  Refused actions are reported as "busy".
+
+    python -m kronologic.loadtest --rooms 50 --players 4 --actions 200
+    python -m kronologic.loadtest --rooms 200 --memory --json report.json --max-p99-ms 20
+    python -m kronologic.loadtest --rooms 50 --limits --abusers 10 --max-p99-ms 20
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from kronologic.admission import Admission, ServerBusy
+from kronologic.engine import MODE_HANDLERS, get_handler
+from kronologic.server import GlobalGameState
+
+# relative frequency of each bot action (reveal is deliberately rare)
+ACTION_WEIGHTS = {
+    "investigate_location": 35,
+    "investigate_person":   35,
+    "poll":                 27,
+    "reveal":               3,
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class Bot:
+    """One simulated player.  Latencies are recorded per action name, in seconds."""
+
+    def __init__(self, server, room_code, mode_code, name, rng, think_time=0.0):
+        self.server     = server
+        self.room_code  = room_code
+        self.mode_code  = mode_code
+        self.name       = name
+        self.rng        = rng
+        self.think_time = think_time
+        self.handler    = get_handler(mode_code)
+        self.cursor     = 0
+        self.seed       = ""
+        self.latencies  = {}
+
+    def _timed(self, action, fn, *args):
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except ServerBusy:                     # abusers' refusals stay out of the honest "all"
+            action, result = "abuse_busy" if action.startswith("abuse_") else "busy", None
+        self.latencies.setdefault(action, []).append(time.perf_counter() - start)
+        return result
+
+    def login(self, forced_seed=""):
+        self.seed = forced_seed                # the page re-sends the seed box on every run
+        while self._timed("login", self.server.get_game, self.room_code, self.mode_code, forced_seed) is None:
+            time.sleep(0.1)                    # refused by the generation gate: retry like a player would
+
+    def step(self):
+        action = self.rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()))[0]
+        if action == "investigate_location":
+            room = self.rng.choice(self.handler.ROOMS)
+            t    = self.rng.choice(self.handler.INVESTIG_TIME_OPTIONS)
+            self._timed(action, self.server.investigate,
+                        self.room_code, self.mode_code, self.name, "location", room, t)
+        elif action == "investigate_person":
+            char = self.rng.choice(self.handler.CHARACTERS)
+            room = self.rng.choice(self.handler.ROOMS)
+            self._timed(action, self.server.investigate,
+                        self.room_code, self.mode_code, self.name, "person", char, room)
+        elif action == "poll":
+            self._timed(action, self._poll)
+        else:
+            self._timed(action, self._reveal)
+
+        if self.think_time:
+            time.sleep(self.think_time)
+
+    def _poll(self):
+        # what one fragment tick does: fetch game + version, read the new log entries
+        self.server.get_game(self.room_code, self.mode_code, self.seed)
+        self.server.get_version(self.room_code, self.mode_code)
+        fresh, self.cursor, _, _ = self.server.logs_since(self.room_code, self.mode_code, self.cursor)
+        return [(log["player"], log["public"], log["private"] if log["owner"] == self.name else None)
+                for log in fresh]
+
+    def _reveal(self):
+        game = self.server.reveal(self.room_code, self.mode_code, self.name)
+        return game.solution_data
+
+
+class Abuser(Bot):
+    """A scripted client spamming new games and log resets with no pause."""
+
+    def step(self):
+        if self.rng.random() < 0.5:
+            self._timed("abuse_new_game", self.server.new_game, self.room_code, self.mode_code, "", self.name)
+        else:
+            self._timed("abuse_reset", self.server.reset_logs, self.room_code, self.mode_code, self.name)
+
+
+def run_load(rooms=20, players=4, actions=100, modes=None, seed=None, think_time=0.0, memory=False,
+             limits=False, abusers=0):
+    """Run one load scenario and return the report dict."""
+    modes = modes or list(MODE_HANDLERS)
+    rng   = random.Random(seed)
+
+    if memory:
+        tracemalloc.start()
+    mem_before = tracemalloc.get_traced_memory()[0] if memory else 0
+
+    server = GlobalGameState(admission=Admission() if limits else Admission.unlimited())
+    bots   = []
+    for r in range(rooms):
+        room_code = f"load{r:05d}"
+        mode_code = modes[r % len(modes)]
+        for p in range(players):
+            bots.append(Bot(server, room_code, mode_code, f"bot{r}_{p}",
+                            random.Random(rng.random()), think_time))
+    for a in range(abusers):
+        bots.append(Abuser(server, f"abuse{a:05d}", modes[a % len(modes)], f"abuser{a}",
+                           random.Random(rng.random())))
+
+    barrier = threading.Barrier(len(bots) + 1)
+
+    def play(bot, forced_seed):
+        barrier.wait()
+        bot.login(forced_seed)
+        for _ in range(actions):
+            bot.step()
+
+    threads = []
+    for i, bot in enumerate(bots):
+        forced_seed = str(seed + i // players) if seed is not None else ""
+        threads.append(threading.Thread(target=play, args=(bot, forced_seed), daemon=True))
+    for th in threads:
+        th.start()
+
+    barrier.wait()
+    wall_start = time.perf_counter()
+    for th in threads:
+        th.join()
+    wall = time.perf_counter() - wall_start
+
+    mem_after = tracemalloc.get_traced_memory()[0] if memory else 0
+    if memory:
+        tracemalloc.stop()
+
+    merged = {}
+    for bot in bots:
+        for action, values in bot.latencies.items():
+            merged.setdefault(action, []).extend(values)
+    # "all" covers what honest players waited for, refusals included
+    merged["all"] = [v for action, values in merged.items() if not action.startswith("abuse_") for v in values]
+
+    report = {
+        "rooms":      rooms,
+        "players":    players,
+        "actions":    actions,
+        "modes":      modes,
+        "limits":     limits,
+        "abusers":    abusers,
+        "wall_s":     wall,
+        "ops":        len(merged["all"]),
+        "throughput": len(merged["all"]) / wall if wall else 0.0,
+        "latency_ms": {},
+    }
+    for action, values in merged.items():
+        values.sort()
+        report["latency_ms"][action] = {
+            "count": len(values),
+            "p50":   percentile(values, 50) * 1000,
+            "p95":   percentile(values, 95) * 1000,
+            "p99":   percentile(values, 99) * 1000,
+            "max":   values[-1] * 1000,
+        }
+    if memory:
+        report["memory_per_room_kb"] = (mem_after - mem_before) / rooms / 1024
+    report["server"] = server.stats()
+    return report
+
+
+def format_report(report) -> str:
+    lines = [
+        f"rooms={report['rooms']} players/room={report['players']} actions/bot={report['actions']} "
+        f"modes={','.join(report['modes'])} limits={'on' if report['limits'] else 'off'} "
+        f"abusers={report['abusers']}",
+        f"ops={report['ops']}  wall={report['wall_s']:.2f}s  throughput={report['throughput']:.0f} ops/s",
+        "",
+        f"{'action':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    for action, row in sorted(report["latency_ms"].items()):
+        lines.append(f"{action:<22}{row['count']:>8}{row['p50']:>10.3f}{row['p95']:>10.3f}"
+                     f"{row['p99']:>10.3f}{row['max']:>10.3f}")
+    prefetch = report.get("server", {}).get("prefetch")
+    if prefetch:
+        lines.append("")
+        lines.append(f"prefetch: prepared={prefetch['prepared']} hits={prefetch['hits']} "
+                     f"misses={prefetch['misses']} dropped={prefetch['dropped']}")
+    admission = report.get("server", {}).get("admission")
+    if admission and report["limits"]:
+        rejected = admission["rejected"]
+        lines.append(f"admission: admitted={admission['admitted']} rejected session={rejected['session']} "
+                     f"room={rejected['room']} generation={rejected['generation']}")
+    if "memory_per_room_kb" in report:
+        lines.append("")
+        lines.append(f"memory/room: {report['memory_per_room_kb']:.1f} KiB "
+                     "(tracemalloc on; latencies above include its overhead)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms",      type=int,   default=20,  help="number of rooms (N)")
+    parser.add_argument("--players",    type=int,   default=4,   help="bots per room (M)")
+    parser.add_argument("--actions",    type=int,   default=100, help="actions per bot after login")
+    parser.add_argument("--modes",      default=",".join(MODE_HANDLERS),
+                        help="comma-separated mode codes, assigned to rooms round-robin")
+    parser.add_argument("--seed",       type=int,   default=None,
+                        help="base seed; room i plays seed+i and bot choices become reproducible")
+    parser.add_argument("--think-ms",   type=float, default=0.0, help="pause between bot actions")
+    parser.add_argument("--memory",     action="store_true", help="measure memory per room with tracemalloc")
+    parser.add_argument("--limits",     action="store_true", help="enable the default admission limits")
+    parser.add_argument("--abusers",    type=int,   default=0,
+                        help="extra clients spamming new games / resets in their own rooms")
+    parser.add_argument("--json",       help="also write the report to this path")
+    parser.add_argument("--max-p99-ms", type=float, default=None,
+                        help="exit non-zero if the overall p99 latency exceeds this budget")
+    args = parser.parse_args(argv)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODE_HANDLERS]
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(unknown)}")
+
+    report = run_load(args.rooms, args.players, args.actions, modes,
+                      args.seed, args.think_ms / 1000, args.memory, args.limits, args.abusers)
+    print(format_report(report))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.max_p99_ms is not None and report["latency_ms"]["all"]["p99"] > args.max_p99_ms:
+        print(f"FAIL: p99 {report['latency_ms']['all']['p99']:.3f} ms > budget {args.max_p99_ms} ms",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Speculative background pre-generation of the next game per active room.
+
+GlobalGameState asks the prefetcher to keep one prepared game per room key
+(``"<room>_<mode>"``).  The seed is fixed when the job is scheduled: either
+the forced seed the room is currently showing, or an automatic time-based
+seed.  ``new_game`` then swaps in the prepared game instead of generating on
+the request path.  Rooms that go idle, or fall out of the bounded table, have
+their prepared game dropped.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Prepared:
+    __slots__ = ("seed_val", "forced", "future", "touched")
+
+    def __init__(self, seed_val, forced, future):
+        self.seed_val = seed_val
+        self.forced   = forced
+        self.future   = future
+        self.touched  = time.monotonic()
+
+
+class GamePrefetcher:
+    """factory(seed_val, mode) -> game is run on a small worker pool."""
+
+    def __init__(self, factory, max_workers=2, max_rooms=256, idle_ttl=30 * 60):
+        self.factory   = factory
+        self.max_rooms = max_rooms
+        self.idle_ttl  = idle_ttl
+        self._pool     = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kronologic-prefetch")
+        self._prepared = OrderedDict()         # game_key -> _Prepared, least recently touched first
+        self._lock     = threading.Lock()
+        self.hits      = 0
+        self.misses    = 0
+        self.dropped   = 0
+
+    def prefetch(self, game_key, mode, forced_seed_val=None, avoid_seed=None):
+        """Make sure game_key has a next game being prepared.
+
+        forced_seed_val: prepare exactly this seed (a pending forced seed).
+        Otherwise an automatic seed is picked now, never equal to avoid_seed
+        (the seed of the game currently in the room)."""
+        forced = forced_seed_val is not None
+        with self._lock:
+            item = self._prepared.get(game_key)
+            # an automatic request is satisfied by whatever is prepared, so players
+            # in one room who differ only in a blank seed box don't thrash the job
+            if item is not None and (not forced or (item.forced and item.seed_val == forced_seed_val)):
+                item.touched = time.monotonic()
+                self._prepared.move_to_end(game_key)
+                return
+            if item is not None:
+                self._drop(game_key)
+
+            if forced:
+                seed_val = forced_seed_val
+            else:
+                seed_val = int(time.time())
+                if avoid_seed is not None and seed_val <= avoid_seed:
+                    seed_val = avoid_seed + 1
+
+            future = self._pool.submit(self.factory, seed_val, mode)
+            self._prepared[game_key] = _Prepared(seed_val, forced, future)
+            self._evict()
+
+    def take(self, game_key, forced_seed_val=None):
+        """Return the prepared game matching the request, or None (a miss).
+
+        A job that is still running is waited for: it is already ahead of a
+        fresh synchronous generation."""
+        forced = forced_seed_val is not None
+        with self._lock:
+            item = self._prepared.get(game_key)
+            if item is None or item.forced != forced or (forced and item.seed_val != forced_seed_val):
+                self.misses += 1
+                return None
+            del self._prepared[game_key]
+
+        try:
+            game = item.future.result()
+        except Exception:                      # cancelled, or generation failed
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return game
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "prepared": len(self._prepared),
+                "hits":     self.hits,
+                "misses":   self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "dropped":  self.dropped,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---- internals (call with the lock held) ----
+    def _drop(self, game_key):
+        item = self._prepared.pop(game_key)
+        item.future.cancel()
+        self.dropped += 1
+
+    def _evict(self):
+        while len(self._prepared) > self.max_rooms:
+            self._drop(next(iter(self._prepared)))
+        deadline = time.monotonic() - self.idle_ttl
+        while self._prepared:
+            game_key, item = next(iter(self._prepared.items()))
+            if item.touched >= deadline:
+                break
+            self._drop(game_key)
@@ -0,0 +1,87 @@
+"""Measure full Streamlit rerun latency of the page with AppTest.
+
+Logs a player into a room, then times repeated reruns of the whole script,
+which is what every widget interaction costs.  ``--compare REV`` also runs
+the app.py of an older git revision, to see what moving static work out of
+the script (engine, registry, lookup tables, cached assets) saved.
+
+    python -m kronologic.rerunbench --runs 50
+    python -m kronologic.rerunbench --runs 50 --compare <older-commit>
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bench(script, runs=50, warmup=3, mode_label=None) -> dict:
+    at = AppTest.from_file(script, default_timeout=120)
+    at.secrets["PASSWORD"] = "bench"
+    at.session_state["password_correct"] = True
+    at.run()
+    if mode_label:
+        at.sidebar.radio[0].set_value(mode_label).run()
+    at.text_input(key="user_name").input("bench").run()
+    at.text_input(key="room_code").input("bench").run()
+    if at.exception:
+        raise RuntimeError(f"{script}: {at.exception[0].value}")
+
+    for _ in range(warmup):
+        at.run()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        at.run()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "script": script,
+        "runs":   runs,
+        "mean":   statistics.fmean(samples),
+        "p50":    samples[len(samples) // 2],
+        "p95":    samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def script_at(rev) -> str:
+    """Write app.py as of a git revision to a temp dir (next to nothing it imports)."""
+    source = subprocess.run(["git", "-C", REPO, "show", f"{rev}:app.py"],
+                            check=True, capture_output=True, text=True).stdout
+    folder = tempfile.mkdtemp(prefix="kronologic-rerun-")
+    path   = os.path.join(folder, "app.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--script",  default=os.path.join(REPO, "app.py"))
+    parser.add_argument("--runs",    type=int, default=50)
+    parser.add_argument("--mode",    default=None, help="sidebar mode label to select first")
+    parser.add_argument("--compare", default=None, help="git revision whose app.py to bench as well")
+    args = parser.parse_args(argv)
+
+    results = [bench(args.script, args.runs, mode_label=args.mode)]
+    if args.compare:
+        results.insert(0, bench(script_at(args.compare), args.runs, mode_label=args.mode))
+        results[0]["script"] = f"{args.compare}:app.py"
+
+    print(f"{'script':<40}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in results:
+        print(f"{r['script'][-40:]:<40}{r['mean']:>10.1f}{r['p50']:>10.1f}{r['p95']:>10.1f}")
+    if len(results) == 2:
+        print(f"p50 change: {(results[1]['p50'] / results[0]['p50'] - 1) * 100:+.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""RoomLog  —  the per-room log store behind GlobalGameState.
+
+System clues published at game start are *pinned* and always shown; player
+entries are appended in ``seq`` order, so the page only ever needs a bounded
+window of the newest entries and older pages are sliced out on demand.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+
+
+def _seq(entry):
+    return entry["seq"]
+
+
+class RoomLog:
+    def __init__(self, seq_source):
+        self.pinned  = []                      # system entries, oldest first
+        self.entries = []                      # player entries, oldest first (ascending seq)
+        self._seq_source = seq_source
+        self._lock       = threading.Lock()
+
+    def pin(self, entry):
+        with self._lock:
+            entry["seq"] = next(self._seq_source)
+            self.pinned.append(entry)
+
+    def append(self, entry):
+        # seq assignment and append under one lock keeps entries sorted by seq
+        with self._lock:
+            entry["seq"] = next(self._seq_source)
+            self.entries.append(entry)
+
+    # ---- reads ----
+    def __len__(self):
+        return len(self.pinned) + len(self.entries)
+
+    def __iter__(self):
+        """Newest entry first, pinned system entries last (the historic page order)."""
+        yield from reversed(self.entries)
+        yield from self.pinned
+
+    def recent(self, limit=None, offset=0) -> list:
+        """Page of player entries, newest first: skip `offset` newest, return up to `limit`."""
+        end   = len(self.entries) - offset
+        start = 0 if limit is None else max(0, end - limit)
+        return self.entries[start:max(0, end)][::-1]
+
+    def since(self, cursor, limit=None):
+        """Entries with seq > cursor, oldest first.  Returns (entries, truncated).
+
+        Pinned entries newer than the cursor are always included; when more
+        than `limit` player entries are new, only the newest `limit` are kept."""
+        pinned = [e for e in self.pinned if e["seq"] > cursor]
+        fresh  = self.entries[bisect_right(self.entries, cursor, key=_seq):]
+        truncated = limit is not None and len(fresh) > limit
+        if truncated:
+            fresh = fresh[-limit:]
+        return pinned + fresh, truncated
+
+    def before(self, seq, limit):
+        """Up to `limit` player entries older than seq, oldest first.  Returns (entries, more)."""
+        end   = bisect_left(self.entries, seq, key=_seq)
+        start = max(0, end - limit)
+        return self.entries[start:end], start > 0
@@ -0,0 +1,106 @@
+"""Measure how generation, solving and investigation cost grow with board size.
+
+Builds ``engine.make_variant`` handlers for a ladder of sizes (characters x
+rooms x times) and times, per size: whole-game generation (board, solve
+retries, initial clues), one ``solve`` of a finished board, and single
+location / person investigations on a fresh query memo.
+
+    python -m kronologic.scalebench
+    python -m kronologic.scalebench --modes jewel,sd_engineer --sizes 6x6x6,12x10x10,48x24x24 --games 50
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from kronologic.engine import MODE_HANDLERS, ScenarioGenerator, get_handler, make_variant
+
+SIZES = ("6x6x6", "12x10x10", "24x16x16", "48x24x24", "96x32x32")
+
+
+def parse_size(text):
+    """"12x10x10" -> (12, 10, 10): characters x rooms x times."""
+    try:
+        chars, rooms, times = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"size must look like CHARSxROOMSxTIMES: {text!r}") from None
+    return chars, rooms, times
+
+
+def _ms(fn, repeat) -> float:
+    """Median wall time of fn() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench(mode, size, games=20, queries=200, seed=0) -> dict:
+    chars, rooms, times = size
+    base    = get_handler(mode)
+    handler = base if (chars, rooms, times) == (len(base.CHARACTERS), len(base.ROOMS), len(base.TIMES)) \
+        else make_variant(mode, chars, rooms, times, seed)
+    seeds   = iter(range(seed, seed + games))
+    generate = _ms(lambda: ScenarioGenerator(next(seeds), handler=handler), games)
+
+    game  = ScenarioGenerator(seed, handler=handler)
+    solve = _ms(lambda: handler.solve(game.board, random.Random(seed)), games)
+
+    rng      = random.Random(seed)
+    location = [(rng.choice(handler.ROOMS), rng.choice(handler.INVESTIG_TIME_OPTIONS)) for _ in range(queries)]
+    person   = [(rng.choice(handler.CHARACTERS), rng.choice(handler.ROOMS)) for _ in range(queries)]
+
+    def run(ask, tuples):
+        game.query = {}                        # answers are memoized per game; always ask fresh
+        for a, b in tuples:
+            ask(game, a, b)
+
+    return {
+        "mode":        mode,
+        "size":        f"{chars}x{rooms}x{times}",
+        "cells":       chars * times,
+        "generate_ms": generate,
+        "solve_ms":    solve,
+        "location_us": _ms(lambda: run(handler.investigate_location, location), 5) * 1000 / queries,
+        "person_us":   _ms(lambda: run(handler.investigate_person, person), 5) * 1000 / queries,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes",   default="jewel,ritual_hard,sd_engineer", help="comma-separated mode codes")
+    parser.add_argument("--sizes",   default=",".join(SIZES), help="comma-separated CHARSxROOMSxTIMES")
+    parser.add_argument("--games",   type=int, default=20,  help="games generated per size")
+    parser.add_argument("--queries", type=int, default=200, help="investigations of each kind per size")
+    parser.add_argument("--seed",    type=int, default=0)
+    args = parser.parse_args(argv)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    if any(m not in MODE_HANDLERS for m in modes):
+        parser.error(f"modes must be among: {', '.join(MODE_HANDLERS)}")
+    try:
+        sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"{'mode':<14}{'size':>10}{'cells':>7}{'gen ms':>9}{'solve ms':>10}{'loc us':>9}{'person us':>11}{'gen x':>7}")
+    for mode in modes:
+        first = None
+        for size in sizes:
+            try:
+                r = bench(mode, size, args.games, args.queries, args.seed)
+            except ValueError as e:            # e.g. more characters than a Ritual mode has paces
+                print(f"{mode:<14}{'x'.join(map(str, size)):>10}  skipped: {e}")
+                continue
+            first = first or r
+            print(f"{r['mode']:<14}{r['size']:>10}{r['cells']:>7}{r['generate_ms']:>9.2f}{r['solve_ms']:>10.3f}"
+                  f"{r['location_us']:>9.1f}{r['person_us']:>11.1f}{r['generate_ms'] / first['generate_ms']:>7.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Parallel seed search for puzzles with target properties.
+
+Generates games over a seed range on a process pool (through the mode
+handlers, exactly as the server would), keeps the seeds whose board and
+solution satisfy every criterion, ranks them by a score, and writes a seed
+index the page can offer to hosts (``KRONOLOGIC_SEED_INDEX``).
+
+    python -m kronologic.seedsearch --mode jewel --where "handoffs>=3" --where "spawn_time==3" -k 20
+    python -m kronologic.seedsearch --mode ritual_hard --score shared_rooms -k 50 --out seeds.json
+    python -m kronologic.seedsearch --mode sd_engineer --where "full_times>=1" --predicate mypkg.rules:hard
+
+Built-in properties (``--list``) can be used in ``--where NAME<op>N`` and
+``--score NAME``; ``--predicate`` / ``--score-fn`` take "package.module:func"
+called with the generated game.  The search stops once K hits are found.
+"""
+
+import argparse
+import importlib
+import json
+import operator
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from kronologic import codec
+from kronologic.engine import MODE_HANDLERS, ScenarioGenerator, board_index
+
+CHUNK_SEEDS = 200
+
+
+# ==============================================================================
+# Properties  —  name -> (fn(game) -> number, modes it applies to or None for all)
+# ==============================================================================
+
+def _handoffs(game):
+    return int(game.solution_data["Desc"].astype(str).str.startswith("交换").sum())
+
+def _spawn_time(game):
+    found = game.solution_data[game.solution_data["Desc"] == "✨ 发现珠宝！"]
+    return int(found["Time"].iloc[0]) if len(found) else 0
+
+def _occupancy(game):
+    """Head counts of the occupied rooms, per time; built on first use and kept on the game."""
+    occupancy = getattr(game, "occupancy", None)
+    if occupancy is None:
+        at = board_index(game).at
+        occupancy = game.occupancy = [[len(at[(t, room)]) for room in game.handler.ROOMS if (t, room) in at]
+                                      for t in game.handler.TIMES]
+    return occupancy
+
+def _shared_rooms(game):
+    return sum(sum(n >= 2 for n in counts) for counts in _occupancy(game))
+
+def _crowd(game):
+    return max(max(counts) for counts in _occupancy(game))
+
+def _empty_slots(game):
+    rooms = len(game.handler.ROOMS)
+    return sum(rooms - len(counts) for counts in _occupancy(game))
+
+def _full_times(game):
+    rooms = len(game.handler.ROOMS)
+    return sum(len(counts) == rooms for counts in _occupancy(game))
+
+PROPERTIES = {
+    "handoffs":     (_handoffs,     ("jewel",), "times the jewel changes hands"),
+    "spawn_time":   (_spawn_time,   ("jewel",), "T at which the jewel is found"),
+    "shared_rooms": (_shared_rooms, None,       "(time, room) slots holding 2+ characters"),
+    "crowd":        (_crowd,        None,       "most characters in one room at one time"),
+    "empty_slots":  (_empty_slots,  None,       "(time, room) slots nobody is in"),
+    "full_times":   (_full_times,   None,       "times at which no room is empty"),
+}
+
+OPS = {">=": operator.ge, "<=": operator.le, "==": operator.eq, "!=": operator.ne,
+       ">": operator.gt, "<": operator.lt}
+_WHERE = re.compile(r"^\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(-?\d+)\s*$")
+
+
+def parse_where(text):
+    """"handoffs>=3" -> ("handoffs", ">=", 3)."""
+    match = _WHERE.match(text)
+    if not match:
+        raise ValueError(f"criterion must look like NAME>=N: {text!r}")
+    name, op, value = match.groups()
+    if name not in PROPERTIES:
+        raise ValueError(f"unknown property: {name}")
+    return name, op, int(value)
+
+
+def properties_for(mode) -> list:
+    return [name for name, (_, modes, _) in PROPERTIES.items() if modes is None or mode in modes]
+
+
+def _load(spec):
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+# ==============================================================================
+# Search
+# ==============================================================================
+
+def search_chunk(mode, start, stop, where=(), score=None, predicate=None, score_fn=None) -> dict:
+    """Worker entry point: hits in [start, stop) as [{"seed", "score", "props", "code"}]."""
+    predicate = _load(predicate) if predicate else None
+    score_fn  = _load(score_fn) if score_fn else None
+    names     = properties_for(mode)
+    hits      = []
+    for seed in range(start, stop):
+        game  = ScenarioGenerator(seed_val=seed, mode=mode)
+        props = {}
+
+        def prop(name):
+            if name not in props:
+                props[name] = PROPERTIES[name][0](game)
+            return props[name]
+
+        if not all(OPS[op](prop(name), value) for name, op, value in where):
+            continue
+        if predicate and not predicate(game):
+            continue
+        for name in names:
+            prop(name)
+        value = score_fn(game) if score_fn else (props[score] if score else 0)
+        hits.append({"seed": seed, "score": value, "props": props, "code": codec.encode(game).hex()})
+    return {"seeds": stop - start, "hits": hits}
+
+
+def search(mode, start=0, count=100_000, k=20, where=(), score=None, descending=True,
+           predicate=None, score_fn=None, workers=None, progress=None) -> dict:
+    """Scan [start, start + count) until k hits are found; returns the ranked result."""
+    for name, _, _ in where:
+        if name not in properties_for(mode):
+            raise ValueError(f"property {name} does not apply to mode {mode}")
+    if score and score not in properties_for(mode):
+        raise ValueError(f"property {score} does not apply to mode {mode}")
+
+    hits, scanned = [], 0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(search_chunk, mode, lo, min(lo + CHUNK_SEEDS, start + count),
+                               tuple(where), score, predicate, score_fn)
+                   for lo in range(start, start + count, CHUNK_SEEDS)]
+        for future in as_completed(futures):
+            result   = future.result()
+            scanned += result["seeds"]
+            hits.extend(result["hits"])
+            if progress:
+                progress(scanned, count, len(hits))
+            if len(hits) >= k:
+                for f in futures:
+                    f.cancel()
+                break
+
+    hits.sort(key=lambda h: ((-h["score"] if descending else h["score"]), h["seed"]))
+    return {
+        "mode":     mode,
+        "criteria": [f"{name}{op}{value}" for name, op, value in where] + ([f"predicate:{predicate}"] if predicate else []),
+        "score":    score_fn or score,
+        "order":    "desc" if descending else "asc",
+        "scanned":  scanned,
+        "wall_s":   time.perf_counter() - t0,
+        "created":  time.strftime("%Y-%m-%d %H:%M:%S"),
+        "seeds":    hits[:k],
+    }
+
+
+# ==============================================================================
+# Seed index  —  {"modes": {mode: search result}}, one ranked list per mode
+# ==============================================================================
+
+def load_index(path) -> dict:
+    if not path or not os.path.exists(path):
+        return {"modes": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_index(path, result):
+    """Store result as the index entry for its mode (other modes are kept)."""
+    index = load_index(path)
+    index.setdefault("modes", {})[result["mode"]] = result
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode",      choices=list(MODE_HANDLERS), default="jewel")
+    parser.add_argument("--where",     action="append", default=[], help="criterion NAME<op>N, repeatable")
+    parser.add_argument("--score",     default=None, help="property to rank hits by")
+    parser.add_argument("--asc",       action="store_true", help="rank ascending (default: highest first)")
+    parser.add_argument("--predicate", default=None, help="extra filter, package.module:func(game) -> bool")
+    parser.add_argument("--score-fn",  default=None, help="custom score, package.module:func(game) -> number")
+    parser.add_argument("-k",          type=int, default=20, help="stop after this many hits")
+    parser.add_argument("--start",     type=int, default=0)
+    parser.add_argument("--count",     type=int, default=100_000, help="seeds to scan at most")
+    parser.add_argument("--workers",   type=int, default=None, help="process pool size (default: CPUs)")
+    parser.add_argument("--out",       default=None, help="seed index to write (merged per mode)")
+    parser.add_argument("--list",      action="store_true", help="list the built-in properties")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (_, modes, doc) in PROPERTIES.items():
+            print(f"{name:<14}{doc}  [{', '.join(modes) if modes else 'all modes'}]")
+        return 0
+
+    try:
+        where  = [parse_where(w) for w in args.where]
+        result = search(args.mode, args.start, args.count, args.k, where, args.score, not args.asc,
+                        args.predicate, args.score_fn, args.workers,
+                        lambda done, total, hits: print(f"\r{done}/{total} seeds, {hits} hits",
+                                                        end="", file=sys.stderr, flush=True))
+    except ValueError as e:
+        parser.error(str(e))
+    print(file=sys.stderr)
+
+    for rank, hit in enumerate(result["seeds"], 1):
+        props = " ".join(f"{k}={v}" for k, v in hit["props"].items())
+        print(f"{rank:>3}. seed {hit['seed']:<10} score {hit['score']:<6} {props}")
+    print(f"{len(result['seeds'])} hit(s) in {result['scanned']} seeds, {result['wall_s']:.1f}s")
+
+    if args.out:
+        save_index(args.out, result)
+        print(f"index written: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""GlobalGameState  —  the shared, in-memory game server.
+
+One instance is shared by every session in a process (``app.py`` wraps it in
+``st.cache_resource``); tools such as the load generator create their own.
+"""
+
+import itertools
+import time
+from datetime import datetime
+
+from kronologic.admission import Admission
+from kronologic.analytics import Analytics
+from kronologic.archive import GameArchiver
+from kronologic.engine import ScenarioGenerator, get_handler
+from kronologic.prefetch import GamePrefetcher
+from kronologic.roomlog import RoomLog
+
+
+class GlobalGameState:
+    def __init__(self, prefetch_workers=2, admission=None, archive_dir=None):
+        self.games     = {}
+        self.logs      = {}                    # game_key -> RoomLog
+        self.versions  = {}
+        self.log_bases = {}                    # seq value just before each log list was (re)started
+        self.rendered  = {}                    # game_key -> {seq: viewer-independent rendering}
+        self._seq      = itertools.count(1)    # every log entry gets a process-wide increasing "seq"
+        # next game per active room, generated off the request path (None = disabled)
+        self.prefetcher = GamePrefetcher(self._make_game, max_workers=prefetch_workers) if prefetch_workers else None
+        # rate limits + generation gate; rejected actions raise admission.ServerBusy
+        self.admission  = admission if admission is not None else Admission()
+        # listener(event, room_code, mode_choice, **data) for "game" / "investigate" / "reveal" /
+        # "reset", and "finish" just before a room's log or game is dropped
+        self.listeners  = []
+        self.analytics  = Analytics()
+        self.subscribe(self.analytics.on_event)
+        # finished games go to a Parquet archive when a directory is given
+        self.archiver   = GameArchiver(archive_dir) if archive_dir else None
+        if self.archiver:
+            self.subscribe(self.archiver.on_event)
+        # name -> kronologic.tournament.Tournament; their tables' game keys skip prefetching
+        self.tournaments = {}
+        self.managed     = set()
+
+    def get_game(self, room_code, mode_choice="jewel", forced_seed=""):
+        game_key = f"{room_code}_{mode_choice}"
+        if forced_seed:
+            seed_val = int(forced_seed)
+        else:
+            seed_val = int(time.time())
+        if game_key not in self.games:
+            with self.admission.generation():
+                self._init_new_game_data(game_key, seed_val, mode_choice)
+            self._emit("game", room_code, mode_choice, seed_val=seed_val)
+        self._prefetch_next(game_key, mode_choice, forced_seed)
+        return self.games[game_key], self.logs[game_key]
+
+    def _init_new_game_data(self, game_key, seed_val, mode_choice):
+        new_game = ScenarioGenerator(seed_val=seed_val, mode=mode_choice)
+        self.games[game_key]    = new_game
+        self._start_log(game_key)
+        self.versions[game_key] = time.time()
+        self._log_initial_clues(game_key, new_game, mode_choice)
+
+    def get_version(self, room_code, mode_choice):
+        game_key = f"{room_code}_{mode_choice}"
+        return self.versions.get(game_key, 0.0)
+
+    def add_log(self, room_code, mode_choice, player, desc, pub, pri, log_type="normal"):
+        game_key  = f"{room_code}_{mode_choice}"
+        timestamp = datetime.now().strftime("%H:%M")
+        entry = {
+            "time":    timestamp,
+            "player":  player,
+            "desc":    desc,
+            "public":  pub,
+            "private": pri,
+            "owner":   player,
+            "type":    log_type
+        }
+        if game_key in self.logs:
+            self.logs[game_key].append(entry)
+
+    def reset_logs(self, room_code, mode_choice, session=None):
+        game_key = f"{room_code}_{mode_choice}"
+        if game_key in self.logs:
+            self.admission.check(session, game_key, "reset")
+            self._finish(room_code, mode_choice, "reset")
+            self._start_log(game_key)
+            if game_key in self.games:
+                self._log_initial_clues(game_key, self.games[game_key], mode_choice)
+            self._emit("reset", room_code, mode_choice)
+
+    def new_game(self, room_code, mode_choice, forced_seed, session=None):
+        game_key = f"{room_code}_{mode_choice}"
+        forced   = int(forced_seed) if forced_seed else None
+        self.admission.check(session, game_key, "new_game")
+
+        new_game = self.prefetcher.take(game_key, forced) if self.prefetcher else None
+        if new_game is None:
+            seed_val = forced if forced is not None else int(time.time())
+            with self.admission.generation():
+                new_game = self._make_game(seed_val, mode_choice)
+
+        self.place_game(room_code, mode_choice, new_game)
+        self._prefetch_next(game_key, mode_choice, forced_seed)
+
+    def place_game(self, room_code, mode_choice, game):
+        """Put an already generated game in a room, replacing its game and log as
+        new_game does.  No admission check and no generation: the caller (e.g. a
+        tournament seating many rooms on one game) has done both."""
+        game_key = f"{room_code}_{mode_choice}"
+        self._finish(room_code, mode_choice, "new_game")
+        self.games[game_key]    = game
+        self._start_log(game_key)
+        self.versions[game_key] = time.time()
+        self._log_initial_clues(game_key, game, mode_choice)
+        self._emit("game", room_code, mode_choice, seed_val=game.seed_val)
+
+    def subscribe(self, listener):
+        """Call listener(event, room_code, mode_choice, **data) after every game event.
+        Listeners run on the request path, so they must be cheap."""
+        self.listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        """Stop calling a listener given to subscribe; unknown listeners are ignored."""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _emit(self, event, room_code, mode_choice, **data):
+        for listener in self.listeners:
+            listener(event, room_code, mode_choice, **data)
+
+    def _finish(self, room_code, mode_choice, reason):
+        game_key = f"{room_code}_{mode_choice}"
+        if game_key in self.games and game_key in self.logs:
+            self._emit("finish", room_code, mode_choice, game=self.games[game_key], log=self.logs[game_key],
+                       started_at=self.versions.get(game_key), reason=reason)
+
+    def stats(self) -> dict:
+        return {
+            "rooms":     len(self.games),
+            "prefetch":  self.prefetcher.stats() if self.prefetcher else None,
+            "admission": self.admission.stats(),
+            "archive":   self.archiver.stats() if self.archiver else None,
+            "tournaments": {name: {"tables": len(cup.tables), "round": cup.round}
+                            for name, cup in self.tournaments.items()},
+        }
+
+    @staticmethod
+    def _make_game(seed_val, mode_choice):
+        return ScenarioGenerator(seed_val=seed_val, mode=mode_choice)
+
+    def _prefetch_next(self, game_key, mode_choice, forced_seed):
+        if self.prefetcher is None or game_key in self.managed:
+            return
+        forced = int(forced_seed) if forced_seed else None
+        self.prefetcher.prefetch(game_key, mode_choice, forced, avoid_seed=self.games[game_key].seed_val)
+
+    def has_game(self, room_code, mode_choice):
+        return f"{room_code}_{mode_choice}" in self.games
+
+    def room_log(self, room_code, mode_choice):
+        return self.logs.get(f"{room_code}_{mode_choice}")
+
+    def logs_since(self, room_code, mode_choice, cursor=0, limit=None):
+        """Entries added after cursor, oldest first.
+
+        Returns (entries, new_cursor, reset, truncated).  reset is True when the
+        log was restarted (new game / cleared) after the cursor was issued; the
+        caller should then replace its view with entries.  Cursor 0 is a first
+        read, never a reset.  truncated is True when only the newest `limit`
+        player entries were returned."""
+        game_key = f"{room_code}_{mode_choice}"
+        room_log = self.logs.get(game_key)
+        if room_log is None:
+            return [], cursor, False, False
+        reset = 0 < cursor < self.log_bases.get(game_key, 0)
+        if reset:
+            cursor = 0
+        entries, truncated = room_log.since(cursor, limit)
+        new_cursor = max((e["seq"] for e in entries), default=cursor)
+        return entries, new_cursor, reset, truncated
+
+    def rendered_logs(self, room_code, mode_choice, render, limit=None, offset=0):
+        """Pinned entries, then a newest-first window of player entries, each
+        paired with render(entry) memoized per entry.
+
+        render must depend only on the entry, so one result serves every viewer
+        of the room; per-viewer details (e.g. the private line) are applied by
+        the caller.  The memo is dropped whenever the room's log restarts."""
+        game_key = f"{room_code}_{mode_choice}"
+        room_log = self.logs.get(game_key)
+        if room_log is None:
+            return []
+        memo = self.rendered.setdefault(game_key, {})
+        out  = []
+        for log in room_log.pinned + room_log.recent(limit, offset):
+            view = memo.get(log["seq"])
+            if view is None:
+                view = memo[log["seq"]] = render(log)
+            out.append((log, view))
+        return out
+
+    def _start_log(self, game_key):
+        self.logs[game_key]      = RoomLog(self._seq)
+        self.log_bases[game_key] = next(self._seq)
+        self.rendered[game_key]  = {}
+
+    # ---- player actions (shared by the GUI and headless clients) ----
+    def investigate(self, room_code, mode_choice, player, query_type, target, arg, session=None):
+        """Answer one investigation and publish it to the room log.
+
+        query_type "location": target = room, arg = time.
+        query_type "person":   target = character, arg = room.
+        session defaults to the player name for rate limiting.
+        Returns (desc, pub, pri)."""
+        game_key = f"{room_code}_{mode_choice}"
+        self.admission.check(session if session is not None else player, game_key, "investigate")
+        game     = self.games[game_key]
+        handler  = get_handler(mode_choice)
+
+        if query_type == "location":
+            desc, pub, pri = handler.investigate_location(game, target, arg)
+        else:
+            desc, pub, pri = handler.investigate_person(game, target, arg)
+
+        self.add_log(room_code, mode_choice, player, desc, pub, pri, log_type="normal")
+        self._emit("investigate", room_code, mode_choice, player=player,
+                   query_type=query_type, target=target, arg=arg, pri=pri)
+        return desc, pub, pri
+
+    def reveal(self, room_code, mode_choice, player, session=None):
+        """Announce that player looked at the answer; returns the game to render.
+        session defaults to the player name for rate limiting."""
+        self.admission.check(session if session is not None else player, f"{room_code}_{mode_choice}", "reveal")
+        self.add_log(
+            room_code, mode_choice,
+            player,
+            "查看了答案！游戏可能已结束。",
+            "注意：该玩家已知晓真相",
+            "N/A",
+            log_type="warning"
+        )
+        self._emit("reveal", room_code, mode_choice, player=player)
+        return self.games.get(f"{room_code}_{mode_choice}")
+
+    # ---- system-log helper (initial clues + any mode-specific extras) ----
+    def _log_initial_clues(self, game_key, game_instance, mode_choice):
+        handler = get_handler(mode_choice)
+
+        if game_instance.initial_clues:
+            clue_str_list = [f"**{c['char'].split(')')[0]})** 在 {c['room']}" for c in game_instance.initial_clues]
+            clue_str      = " | ".join(clue_str_list)
+
+            entry = {
+                "time":    "00:00",
+                "player":  "系统",
+                "desc":    "发布初始信息 (T1)",
+                "public":  f"📍 {clue_str}",
+                "private": "所有玩家可见",
+                "owner":   "SYSTEM",
+                "type":    "warning"
+            }
+            self.logs[game_key].pin(entry)
+
+        # let the handler append any extra system entries (e.g. pace)
+        for extra in handler.log_extra_system_clues(game_instance):
+            self.logs[game_key].pin(extra)
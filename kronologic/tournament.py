@@ -0,0 +1,263 @@
+"""Tournaments: many tables playing the same generated game, with a live leaderboard.
+
+A Tournament seats N rooms ("tables") of one mode on a GlobalGameState.  Each
+round generates ONE game and places a shallow copy of it in every table:
+board, solution, clues and the board index are shared, only the per-table
+investigation memo (``query``) is new.  All tables get their game in one
+batch, so the round starts together.
+
+The leaderboard is fed by the server's events (``GlobalGameState.subscribe``):
+an investigation bumps its table's counter, the table's first reveal stops
+it and files the table into the sorted standings (one insort).  Reading the
+round standings never looks at a room log.  A table whose game is replaced
+from outside (a player pressing "new game") is marked as having left the
+round.
+
+``start`` reserves the name in ``server.tournaments``, refuses tables whose
+rooms are already in use, seats the first round and only then hands the
+tables to the tournament (their keys in ``server.managed``, the event feed);
+``close`` undoes all three and leaves the tables as ordinary rooms.  Creating a tournament and each round are charged to the
+admission "new_game" buckets, and at most MAX_TOURNAMENTS run at once.
+
+    python -m kronologic.tournament --tables 300 --rounds 2     # simulated event, prints costs
+"""
+
+import argparse
+import copy
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from bisect import insort
+
+from kronologic.engine import board_index, get_handler
+
+MAX_TOURNAMENTS = 8                            # live tournaments per server
+
+_REGISTRY = threading.Lock()                   # name checks + registration in server.tournaments
+
+
+class Table:
+    """One room of the tournament; the counters are for the current round."""
+    __slots__ = ("room", "investigations", "revealed_at", "left",
+                 "rounds_finished", "total_investigations", "total_seconds")
+
+    def __init__(self, room):
+        self.room                 = room
+        self.investigations       = 0
+        self.revealed_at          = None
+        self.left                 = False
+        self.rounds_finished      = 0
+        self.total_investigations = 0
+        self.total_seconds        = 0.0
+
+
+class Tournament:
+    def __init__(self, server, name, mode, tables, clock=time.time):
+        """tables: a count (rooms "<name>-001" ...) or a list of room codes."""
+        get_handler(mode)                      # unknown modes fail here, before anything is seated
+        rooms = [f"{name}-{i:03d}" for i in range(1, tables + 1)] if isinstance(tables, int) else list(tables)
+        if not rooms:
+            raise ValueError("a tournament needs at least one table")
+        self.server     = server
+        self.name       = name
+        self.mode       = mode
+        self.clock      = clock
+        self.tables     = {room: Table(room) for room in rooms}
+        self.round      = 0
+        self.seed_val   = None
+        self.started_at = None
+        self.finished   = []                   # (investigations, seconds, room) of this round, sorted
+        self._placing   = False
+        self._lock      = threading.RLock()     # held while seating; place_game calls back into on_event
+
+    # ---- lifecycle ----
+    def start(self, seed_val=None, session=None) -> int:
+        """Reserve the name, seat the first round, then register with the server.
+        Raises ValueError if the name is taken, MAX_TOURNAMENTS are running or a
+        table's room is in use; nothing stays registered when any step fails."""
+        with _REGISTRY:
+            self._check_free()
+            self.server.tournaments[self.name] = self      # reserved: a concurrent start of this name fails
+        try:
+            self.start_round(seed_val, session)
+            self.server.managed.update(self._keys())
+            self.server.subscribe(self.on_event)
+        except BaseException:
+            self.close()
+            raise
+        return self.round
+
+    def close(self):
+        """Stop following the tables; their games stay, as ordinary rooms."""
+        server = self.server
+        server.unsubscribe(self.on_event)
+        server.managed.difference_update(self._keys())
+        if server.tournaments.get(self.name) is self:
+            del server.tournaments[self.name]
+
+    def _keys(self):
+        return [f"{room}_{self.mode}" for room in self.tables]
+
+    def _check_free(self):
+        live = self.server.tournaments
+        if self.name in live:
+            raise ValueError(f"tournament {self.name} already exists")
+        if len(live) >= MAX_TOURNAMENTS:
+            raise ValueError(f"{len(live)} tournaments are running (max {MAX_TOURNAMENTS}); end one first")
+        # seating replaces a room's game and log: never take over a live room or another cup's table
+        taken = [room for room in self.tables if self.server.has_game(room, self.mode)
+                 or any(room in cup.tables for cup in live.values() if cup.mode == self.mode)]
+        if taken:
+            raise ValueError(f"rooms already in use: {', '.join(taken[:5])}{' ...' if len(taken) > 5 else ''}")
+
+    # ---- rounds ----
+    def start_round(self, seed_val=None, session=None) -> int:
+        """Generate one game and seat every table on it.  Returns the round number.
+        Charged like a new game to session (if known) and to the tournament."""
+        self.server.admission.check(session, f"tournament:{self.name}", "new_game")
+        seed_val = int(time.time()) if seed_val is None else int(seed_val)
+        with self.server.admission.generation():
+            shared = self.server._make_game(seed_val, self.mode)
+        board_index(shared)                    # built once, shared by every table's copy
+
+        with self._lock:
+            self.round     += 1
+            self.seed_val   = seed_val
+            self.started_at = self.clock()
+            self.finished   = []
+            for table in self.tables.values():
+                table.investigations = 0
+                table.revealed_at    = None
+                table.left           = False
+            # seat under the lock: a "game" event from another thread waits until seating
+            # is over, so an outside new game is never mistaken for one of ours
+            self._placing = True
+            try:
+                for room in self.tables:
+                    game       = copy.copy(shared)
+                    game.query = {}            # answers are memoized per table
+                    self.server.place_game(room, self.mode, game)
+            finally:
+                self._placing = False
+            return self.round
+
+    # ---- feed (GlobalGameState listener) ----
+    def on_event(self, event, room_code, mode_choice, **data):
+        table = self.tables.get(room_code)
+        if table is None or mode_choice != self.mode or event in ("finish", "reset"):
+            return
+        with self._lock:
+            if event == "game":
+                if not self._placing:
+                    table.left = True          # the table's game was replaced from outside
+            elif table.left or table.revealed_at is not None or self.started_at is None:
+                return
+            elif event == "investigate":
+                table.investigations += 1
+            elif event == "reveal":
+                elapsed = self.clock() - self.started_at
+                table.revealed_at           = elapsed
+                table.rounds_finished      += 1
+                table.total_investigations += table.investigations
+                table.total_seconds        += elapsed
+                insort(self.finished, (table.investigations, elapsed, room_code))
+
+    # ---- read ----
+    def leaderboard(self, top=None) -> dict:
+        """Round standings (fewest investigations, then fastest reveal) and overall standings."""
+        with self._lock:
+            finished = self.finished[:top] if top else list(self.finished)
+            playing  = sorted((t.investigations, t.room) for t in self.tables.values()
+                              if t.revealed_at is None and not t.left)
+            left     = [t.room for t in self.tables.values() if t.left]
+            overall  = sorted(self.tables.values(),
+                              key=lambda t: (-t.rounds_finished, t.total_investigations, t.total_seconds, t.room))
+            overall  = [{"rank": i, "room": t.room, "rounds": t.rounds_finished,
+                         "investigations": t.total_investigations, "seconds": round(t.total_seconds, 1)}
+                        for i, t in enumerate(overall[:top] if top else overall, 1)]
+            return {
+                "name":     self.name,
+                "mode":     self.mode,
+                "round":    self.round,
+                "seed":     self.seed_val,
+                "tables":   len(self.tables),
+                "standings": [{"rank": i, "room": room, "investigations": n, "seconds": round(s, 1)}
+                              for i, (n, s, room) in enumerate(finished, 1)],
+                "playing":  [{"room": room, "investigations": n} for n, room in playing],
+                "left":     left,
+                "overall":  overall,
+            }
+
+
+# ==============================================================================
+# Simulated event  —  seats tables, plays them with random queries, reports costs
+# ==============================================================================
+
+def simulate(tables=300, rounds=2, queries=(3, 12), seed=0) -> dict:
+    from kronologic.admission import Admission
+    from kronologic.server import GlobalGameState
+
+    rng    = random.Random(seed)
+    server = GlobalGameState(prefetch_workers=0, admission=Admission.unlimited())
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    cup    = Tournament(server, "cup", "jewel", tables)
+    handler = get_handler(cup.mode)
+
+    seat_s, play_s, events = [], 0.0, 0
+    for r in range(rounds):
+        t0 = time.perf_counter()
+        if r == 0:
+            cup.start(seed)
+        else:
+            cup.start_round(seed + r)
+        seat_s.append(time.perf_counter() - t0)
+        if r == 0:
+            memory = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(before, "filename"))
+            tracemalloc.stop()
+
+        t0 = time.perf_counter()
+        for room in cup.tables:
+            for _ in range(rng.randint(*queries)):
+                if rng.random() < 0.5:
+                    server.investigate(room, cup.mode, "bot", "location",
+                                       rng.choice(handler.ROOMS), rng.choice(handler.INVESTIG_TIME_OPTIONS))
+                else:
+                    server.investigate(room, cup.mode, "bot", "person",
+                                       rng.choice(handler.CHARACTERS), rng.choice(handler.ROOMS))
+                events += 1
+            if rng.random() < 0.9:
+                server.reveal(room, cup.mode, "bot")
+                events += 1
+        play_s += time.perf_counter() - t0
+
+    t0    = time.perf_counter()
+    board = cup.leaderboard(top=10)
+    read_ms = (time.perf_counter() - t0) * 1000
+    return {"tables": tables, "rounds": rounds, "seat_ms_per_table": 1000 * max(seat_s) / tables,
+            "seat_ms": 1000 * max(seat_s), "kb_per_table": memory / 1024 / tables,
+            "us_per_action": 1e6 * play_s / events, "leaderboard_ms": read_ms, "board": board}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--seed",   type=int, default=0)
+    args = parser.parse_args(argv)
+
+    r = simulate(args.tables, args.rounds, seed=args.seed)
+    print(f"{r['tables']} tables x {r['rounds']} rounds")
+    print(f"seating a round   {r['seat_ms']:.1f} ms  ({r['seat_ms_per_table']:.3f} ms per table)")
+    print(f"memory per table  {r['kb_per_table']:.1f} KiB (game copy, log, clue entries, table slot)")
+    print(f"per action        {r['us_per_action']:.1f} us (investigate / reveal incl. leaderboard update)")
+    print(f"leaderboard read  {r['leaderboard_ms']:.2f} ms")
+    for row in r["board"]["standings"][:5]:
+        print(f"  #{row['rank']:<3} {row['room']:<10} {row['investigations']:>3} investigations  {row['seconds']}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())